@@ -0,0 +1,178 @@
+"""
+Time reading, writing and round tripping synthetic maps in each format and
+print the results as JSON.
+
+    python -m benchmarks [--walls 1024 32768] [--tiles 64 1024] [--repeat 5] [-o results.json]
+
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+
+from benchmarks.synthesize import MAX_WALLS, make_build_map, make_havoc_map
+from gameengines.build.blood import Map as BloodMap, MapReader as BloodMapReader, MapWriter as BloodMapWriter
+from gameengines.build.duke3d import Map as Duke3dMap, MapReader as Duke3dMapReader, MapWriter as Duke3dMapWriter
+from gameengines.wolf3d.map import HavocMapReader, HavocMapWriter
+
+
+# Map and section counts are 16 bit in every Build format, so the largest
+# size stops at the format limit rather than 1M walls.
+WALL_COUNTS = (1024, 4096, 16384, MAX_WALLS)
+TILE_COUNTS = (64, 256, 1024)
+
+BUILD_FORMATS = {
+    'duke3d': (Duke3dMap, Duke3dMapReader, Duke3dMapWriter),
+    'blood': (BloodMap, BloodMapReader, BloodMapWriter),
+}
+
+# Reader options for each way a Build map can be held in memory.
+BUILD_MODES = {
+    'records': {},
+    'columnar': {'columnar': True},
+}
+
+
+def time_call(func: Callable, repeat: int) -> float:
+    """
+    Return the best of several timed calls, which is the least affected by
+    whatever else the machine is doing.
+
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_peak(func: Callable) -> int:
+    """
+    Return the peak memory allocated by a single call, in bytes. Kept apart
+    from timing since tracing slows allocation down.
+
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(read: Callable, write: Callable, round_trip: Callable, repeat: int) -> dict:
+    result = {}
+    for name, func in (('read', read), ('write', write), ('round_trip', round_trip)):
+        result[f'{name}_seconds'] = time_call(func, repeat)
+        result[f'{name}_peak_bytes'] = measure_peak(func)
+    return result
+
+
+def benchmark_build(name: str, mode: str, num_walls: int, repeat: int) -> dict:
+    map_cls, reader_cls, writer_cls = BUILD_FORMATS[name]
+    m = make_build_map(map_cls, num_walls)
+    if mode == 'records':
+        m = m.to_records()
+    output = io.BytesIO()
+    writer_cls()(m, output)
+    data = output.getvalue()
+    reader = reader_cls(**BUILD_MODES[mode])
+
+    def write():
+        writer_cls()(m, io.BytesIO())
+
+    def round_trip() -> bytes:
+        output = io.BytesIO()
+        writer_cls()(reader(data), output)
+        return output.getvalue()
+
+    return {
+        'format': name,
+        'mode': mode,
+        'sectors': len(m.sectors),
+        'walls': len(m.walls),
+        'sprites': len(m.sprites),
+        'bytes': len(data),
+        'round_trip_identical': round_trip() == data,
+        **measure(lambda: reader(data), write, round_trip, repeat),
+    }
+
+
+def benchmark_havoc(size: int, repeat: int, temp_dir: str) -> dict:
+    m = make_havoc_map(size)
+    file_path = os.path.join(temp_dir, f'havoc_{size}.map')
+    copy_path = os.path.join(temp_dir, f'havoc_{size}_copy.map')
+    HavocMapWriter()(m, file_path)
+    with open(file_path, 'rb') as file:
+        data = file.read()
+
+    def round_trip() -> bytes:
+        HavocMapWriter()(HavocMapReader()(file_path), copy_path)
+        with open(copy_path, 'rb') as file:
+            return file.read()
+
+    return {
+        'format': 'havoc',
+        'mode': 'tiles',
+        'width': size,
+        'height': size,
+        'bytes': len(data),
+        'round_trip_identical': round_trip() == data,
+        **measure(lambda: HavocMapReader()(file_path), lambda: HavocMapWriter()(m, copy_path), round_trip, repeat),
+    }
+
+
+def get_environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--walls', type=int, nargs='+', default=WALL_COUNTS, help='Build map sizes, in walls')
+    parser.add_argument('--tiles', type=int, nargs='+', default=TILE_COUNTS, help='Havoc map sizes, in tiles per side')
+    parser.add_argument('--formats', nargs='+', choices=(*BUILD_FORMATS, 'havoc'), default=(*BUILD_FORMATS, 'havoc'))
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per measurement, the best is kept')
+    parser.add_argument('-o', '--output', help='file to write the JSON results to instead of stdout')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in BUILD_FORMATS:
+        if name not in args.formats:
+            continue
+        for num_walls in args.walls:
+            for mode in BUILD_MODES:
+                results.append(benchmark_build(name, mode, num_walls, args.repeat))
+                print(f'{name} {mode} {num_walls} walls: done', file=sys.stderr)
+    if 'havoc' in args.formats:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for size in args.tiles:
+                results.append(benchmark_havoc(size, args.repeat, temp_dir))
+                print(f'havoc {size}x{size} tiles: done', file=sys.stderr)
+
+    report = {'environment': get_environment(), 'repeat': args.repeat, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
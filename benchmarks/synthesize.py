@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+
+from gameengines.build.builder import MapBuilder
+from gameengines.build.map import Map
+from gameengines.wolf3d.map import Wolf3dMap
+
+
+# wallptr is a signed 16 bit field, so no Build map can hold more walls.
+MAX_WALLS = 32768
+
+
+def make_build_map(map_cls: type[Map], num_walls: int, seed: int = 0) -> Map:
+    """
+    Return a columnar map of square sectors laid out in a grid with roughly
+    num_walls walls, and one sprite per sector at a random point inside it.
+    One in four records has extra set, so Blood maps carry extended data.
+
+    """
+    num_sectors = max(1, min(num_walls, MAX_WALLS) // 4)
+    columns = math.ceil(math.sqrt(num_sectors))
+    rows = math.ceil(num_sectors / columns)
+    mask = (np.arange(rows * columns) < num_sectors).reshape(rows, columns)
+    rng = np.random.default_rng(seed)
+    extra = np.where(np.arange(num_sectors) % 4 == 0, 1, -1)
+
+    builder = MapBuilder(map_cls)
+    sectors = builder.add_grid(
+        columns,
+        rows,
+        1024,
+        mask=mask,
+        sector={'ceilingz': -16384, 'floorz': 8192, 'floorpicnum': rng.integers(0, 4096, num_sectors), 'extra': extra},
+        wall={'picnum': 1, 'xrepeat': 8, 'yrepeat': 8},
+    )
+    builder.add_sprites(
+        (sectors % columns) * 1024 + rng.integers(1, 1024, num_sectors),
+        (sectors // columns) * 1024 + rng.integers(1, 1024, num_sectors),
+        8192,
+        sectnum=sectors,
+        sprite={'picnum': rng.integers(0, 4096, num_sectors), 'xrepeat': 64, 'yrepeat': 64, 'extra': extra},
+    )
+    header = map_cls.header_cls(posx=512, posy=512, cursectnum=0)
+    return map_cls.from_map(builder.build(header))
+
+
+def make_havoc_map(size: int, seed: int = 0) -> Wolf3dMap:
+    """
+    Return a size by size map of random tiles across all three planes.
+
+    """
+    m = Wolf3dMap('Benchmark', size, size)
+    m.tiles[:] = np.random.default_rng(seed).integers(0, 256, m.tiles.shape)
+    return m
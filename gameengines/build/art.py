@@ -0,0 +1,202 @@
+import ctypes
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from gameengines.build.structures import ArtHeader
+
+
+@dataclass
+class ArtTables:
+
+    header: ArtHeader
+    tilesizx: np.ndarray
+    tilesizy: np.ndarray
+    picanm: np.ndarray
+    data_offset: int
+
+    @property
+    def numtiles(self) -> int:
+        return len(self.tilesizx)
+
+
+def read_art_tables(data) -> ArtTables:
+    """
+    Read the ART header and the per-tile size and animation tables that
+    follow it. Tile pixel data starts straight after the tables.
+
+    """
+    view = memoryview(data).cast('B')
+    header = ArtHeader.from_view(view)
+
+    # The local tile range is inclusive.
+    numtiles = header.localtileend - header.localtilestart + 1
+    offset = ctypes.sizeof(ArtHeader)
+    if len(view) < offset + numtiles * 8:
+        raise EOFError('Not enough bytes to fill ART tables')
+    tilesizx = np.frombuffer(view, dtype='<i2', count=numtiles, offset=offset)
+    tilesizy = np.frombuffer(view, dtype='<i2', count=numtiles, offset=offset + numtiles * 2)
+    picanm = np.frombuffer(view, dtype='<i4', count=numtiles, offset=offset + numtiles * 4)
+    return ArtTables(header, tilesizx, tilesizy, picanm, offset + numtiles * 8)
+
+
+class TileAtlas:
+
+    """
+    Pixel data for many tiles held in one contiguous buffer, indexed by each
+    tile's offset and dimensions. Tiles are column-major, as in the ART file,
+    so each one is a (width, height) view into the atlas.
+
+    """
+
+    def __init__(self, pixels: np.ndarray, offsets: np.ndarray, widths: np.ndarray, heights: np.ndarray, tilestart: int = 0):
+        self.pixels = pixels
+        self.offsets = offsets
+        self.widths = widths
+        self.heights = heights
+
+        # Tile number of the first tile in the atlas.
+        self.tilestart = tilestart
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        offset = int(self.offsets[index])
+        width, height = int(self.widths[index]), int(self.heights[index])
+        return self.pixels[offset:offset + width * height].reshape((width, height))
+
+    @property
+    def nbytes(self) -> int:
+        return self.pixels.nbytes + self.offsets.nbytes + self.widths.nbytes + self.heights.nbytes
+
+    @classmethod
+    def concatenate(cls, atlases: list['TileAtlas']) -> 'TileAtlas':
+        """
+        Merge atlases into a single new one, copying all pixels into one
+        allocation. Atlases are kept in the order given.
+
+        """
+        pixels = np.empty(sum(len(atlas.pixels) for atlas in atlases), dtype=np.uint8)
+        offsets = []
+        start = 0
+        for atlas in atlases:
+            pixels[start:start + len(atlas.pixels)] = atlas.pixels
+            offsets.append(atlas.offsets + start)
+            start += len(atlas.pixels)
+        return cls(
+            pixels,
+            np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64),
+            np.concatenate([atlas.widths for atlas in atlases]) if atlases else np.empty(0, dtype=np.int32),
+            np.concatenate([atlas.heights for atlas in atlases]) if atlases else np.empty(0, dtype=np.int32),
+            atlases[0].tilestart if atlases else 0,
+        )
+
+
+def load_atlas(data) -> TileAtlas:
+    """
+    Decode an ART file as an atlas. The pixel data is already stored
+    contiguously, so the atlas is a view into data rather than a copy.
+
+    """
+    tables = read_art_tables(data)
+    widths = tables.tilesizx.astype(np.int32)
+    heights = tables.tilesizy.astype(np.int32)
+    sizes = widths.astype(np.int64) * heights
+    offsets = np.cumsum(sizes) - sizes
+    total = int(sizes.sum())
+    view = memoryview(data).cast('B')
+    if len(view) < tables.data_offset + total:
+        raise EOFError('Not enough bytes to fill ART tiles')
+    pixels = np.frombuffer(view, dtype=np.uint8, count=total, offset=tables.data_offset)
+    return TileAtlas(pixels, offsets, widths, heights, tables.header.localtilestart)
+
+
+def read_atlas(file_path: str, offset: int = 0, size: int = -1) -> TileAtlas:
+    """
+    Read and decode an ART file, or an ART member at offset within an
+    archive. Only plain arguments go in, so this can run in another process.
+
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        return load_atlas(f.read(size))
+
+
+class ArtFile:
+
+    """
+    Random access to the tiles of a single ART file by tile number. Tile
+    offsets are worked out once from the size tables, so any tile can be
+    decoded without reading the pixel data before it.
+
+    Accepts a path, in which case only the tables are read up front and each
+    tile is a single seek and read, or a buffer such as a GRP member view.
+
+    """
+
+    def __init__(self, source: str | os.PathLike | bytes | memoryview):
+        self.file = None
+        self.view = None
+        if isinstance(source, (str, os.PathLike)):
+            self.file = open(source, 'rb')
+            data = self.file.read(ctypes.sizeof(ArtHeader))
+            header = ArtHeader.from_view(data)
+            data += self.file.read((header.localtileend - header.localtilestart + 1) * 8)
+        else:
+            data = self.view = memoryview(source).cast('B')
+        self.tables = read_art_tables(data)
+        if self.view is not None:
+            # Copy the small tables so close can let go of the source buffer.
+            self.tables.tilesizx = self.tables.tilesizx.copy()
+            self.tables.tilesizy = self.tables.tilesizy.copy()
+            self.tables.picanm = self.tables.picanm.copy()
+        self.widths = self.tables.tilesizx.astype(np.int32)
+        self.heights = self.tables.tilesizy.astype(np.int32)
+        sizes = self.widths.astype(np.int64) * self.heights
+        self.offsets = self.tables.data_offset + np.cumsum(sizes) - sizes
+
+    def __enter__(self) -> 'ArtFile':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.tables.numtiles
+
+    def __contains__(self, tilenum: int) -> bool:
+        return self.tilestart <= tilenum < self.tilestart + len(self)
+
+    def __getitem__(self, tilenum: int) -> np.ndarray:
+        if tilenum not in self:
+            raise IndexError(f'Tile {tilenum} not in ART file')
+        index = tilenum - self.tilestart
+        offset = int(self.offsets[index])
+        width, height = int(self.widths[index]), int(self.heights[index])
+        if self.view is not None:
+            if len(self.view) < offset + width * height:
+                raise EOFError('Not enough bytes to fill tile')
+            pixels = np.frombuffer(self.view, dtype=np.uint8, count=width * height, offset=offset)
+        else:
+            self.file.seek(offset)
+            data = self.file.read(width * height)
+            if len(data) < width * height:
+                raise EOFError('Not enough bytes to fill tile')
+            pixels = np.frombuffer(data, dtype=np.uint8)
+        return pixels.reshape((width, height))
+
+    @property
+    def tilestart(self) -> int:
+        return self.tables.header.localtilestart
+
+    @property
+    def picanm(self) -> np.ndarray:
+        return self.tables.picanm
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        if self.view is not None:
+            self.view.release()
@@ -1,14 +1,50 @@
 import binascii
+import errno
+import functools
+import io
 import struct
 from dataclasses import asdict, dataclass
 from typing import BinaryIO
 
+import numpy as np
+
 from gameengines.build.map import Map as MapBase, MapReaderBase, MapWriterBase, Sector, Sprite, Wall
 
 
 MASTER_CRYPT_KEY = 0x7474614d
 
 
+@functools.cache
+def get_key_stream(key: int, size: int) -> np.ndarray:
+    """
+    Return the bytes XORed against a single record. Only the low byte of the
+    key affects the result, so that's all the cache is keyed on.
+
+    """
+    stream = ((key + np.arange(size)) & 0xFF).astype(np.uint8)
+    stream.flags.writeable = False
+    return stream
+
+
+def crypt(data: bytes, record_size: int, key: int) -> bytes:
+    """
+    XOR a run of contiguous records against the key stream, which restarts
+    for each record. The stream is broadcast across all whole records in one
+    go, with any partial record at the end handled separately.
+
+    """
+    array = np.frombuffer(data, dtype=np.uint8)
+    if not record_size or not len(array):
+        return bytes(data)
+    stream = get_key_stream(key & 0xFF, record_size)
+    num_records, remainder = divmod(len(array), record_size)
+    result = np.empty_like(array)
+    whole = num_records * record_size
+    np.bitwise_xor(array[:whole].reshape(num_records, record_size), stream, out=result[:whole].reshape(num_records, record_size))
+    np.bitwise_xor(array[whole:], stream[:remainder], out=result[whole:])
+    return result.tobytes()
+
+
 @dataclass(slots=True)
 class Header:
 
@@ -43,6 +79,18 @@ class Map(MapBase):
     header_fmt = '<iiihhhiiciHHH'
     header_cls = Header
 
+    @classmethod
+    def make_extra_data(cls, name: str, indices: np.ndarray, extra_size: int) -> dict[int, bytes]:
+        """
+        Return blank xsector, xwall or xsprite data for the given records. The
+        only field filled in is the 14 bit reference back to the owning record,
+        which leads the first bitfield of all three.
+
+        """
+        data = np.zeros((len(indices), extra_size), dtype=np.uint8)
+        data[:, :4] = (indices & 0x3FFF).astype('<u4').view(np.uint8).reshape(-1, 4)
+        return dict(zip(indices.tolist(), map(bytes, data)))
+
 
 class MapReader(MapReaderBase):
 
@@ -60,10 +108,19 @@ class MapReader(MapReaderBase):
 
         """
         if key is not None:
-            data = bytearray(data)
-            for index in range(len(data)):
-                data[index] ^= (key + index) & 0xFF
-            return bytes(data)
+            return crypt(data, len(data), key)
+        return data
+
+    @classmethod
+    def decrypt_section(cls, data: bytes, record_size: int, key: int | None) -> bytes:
+        if key is not None:
+            return crypt(data, record_size, key)
+        return data
+
+    @staticmethod
+    def decrypt_field(data: np.ndarray, field_offset: int, key: int | None) -> np.ndarray:
+        if key is not None:
+            return data ^ get_key_stream(key & 0xFF, field_offset + data.shape[-1])[field_offset:]
         return data
 
     @property
@@ -75,12 +132,13 @@ class MapReader(MapReaderBase):
         signature, version = struct.unpack(self.map_cls.pre_header_fmt, data)
         version >>= 8
         data = bytearray(file.read(self.header_size))
-        unpacked = struct.unpack(self.map_cls.header_fmt, self.decrypt(data, MASTER_CRYPT_KEY))
+        unpacked = struct.unpack(self.map_cls.header_fmt, self.decrypt_records(data, len(data), MASTER_CRYPT_KEY))
 
         header = self.map_cls.header_cls(signature, version, *unpacked)
 
 
-        data = self.decrypt(bytearray(file.read(130)), header.numwalls)
+        data = bytearray(file.read(130))
+        data = self.decrypt_records(data, len(data), header.numwalls)
         header.x_sprite_size, header.x_wall_size, header.x_sector_size = struct.unpack('<iii', data[64:76])
 
         # TODO: Parse remaining data.
@@ -107,13 +165,60 @@ class MapReader(MapReaderBase):
         return super().get_sprites(file, num_sprites, header, decrypt_key=header.revision * self.sprite_size | MASTER_CRYPT_KEY)
 
 
+class CrcWriter:
+
+    """
+    Write-only file wrapper that keeps a running CRC32 of everything passed
+    through it, so the map's checksum is ready the moment its last byte goes
+    out. The wrapped file needn't be seekable.
+
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.crc = 0
+        self.position = 0
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast('B')
+        if not isinstance(self.file, io.RawIOBase):
+            # Buffered streams take everything or raise, and may return None.
+            try:
+                self.file.write(view)
+            except BlockingIOError as e:
+                self.update(view[:e.characters_written])
+                raise
+            self.update(view)
+            return len(view)
+
+        # Raw streams such as pipes and sockets may take less than asked, or
+        # nothing at all if they're non-blocking.
+        written = 0
+        while written < len(view):
+            num_written = self.file.write(view[written:])
+            if not num_written:
+                self.update(view[:written])
+                raise BlockingIOError(errno.EAGAIN, 'Stream accepted no bytes', written)
+            written += num_written
+        self.update(view)
+        return len(view)
+
+    def update(self, view: memoryview):
+        self.crc = binascii.crc32(view, self.crc)
+        self.position += len(view)
+
+    def tell(self) -> int:
+        return self.position
+
+
 class MapWriter(MapWriterBase):
 
     map_cls = Map
 
     def __call__(self, m: Map, file: BinaryIO):
-        super().__call__(m, file)
-        self.write_crc(m, file)
+        sink = CrcWriter(file)
+        super().__call__(m, sink)
+        self.run_phase('crc', self.write_crc, m, sink, file=sink)
 
     @staticmethod
     def encrypt(data: bytes, key: int | None) -> bytes:
@@ -122,10 +227,13 @@ class MapWriter(MapWriterBase):
 
         """
         if key is not None:
-            data = bytearray(data)
-            for index in range(len(data)):
-                data[index] ^= (key + index) & 0xFF
-            return bytes(data)
+            return crypt(data, len(data), key)
+        return data
+
+    @classmethod
+    def encrypt_section(cls, data: bytes, record_size: int, key: int | None) -> bytes:
+        if key is not None:
+            return crypt(data, record_size, key)
         return data
 
     def write_header(self, m: Map, file: BinaryIO, encrypt_key: int | None = None):
@@ -145,7 +253,7 @@ class MapWriter(MapWriterBase):
 
         # TODO: This isn't currently picking up new num_ values.
         packed = bytearray(struct.pack(self.map_cls.header_fmt, *data[2:-5]))
-        file.write(self.encrypt(packed, MASTER_CRYPT_KEY))
+        file.write(self.encrypt_records(packed, len(packed), MASTER_CRYPT_KEY))
 
 
         foo = bytearray()
@@ -156,7 +264,7 @@ class MapWriter(MapWriterBase):
 
 
 
-        file.write(self.encrypt(foo, m.header.numwalls))
+        file.write(self.encrypt_records(foo, len(foo), m.header.numwalls))
 
     def write_num_sectors(self, m: Map, file: BinaryIO):
         pass
@@ -176,6 +284,5 @@ class MapWriter(MapWriterBase):
     def write_sprites(self, m: Map, file: BinaryIO, encrypt_key: int | None = None):
         super().write_sprites(m, file, encrypt_key=m.header.revision * self.sprite_size | MASTER_CRYPT_KEY)
 
-    def write_crc(self, m: Map, file: BinaryIO):
-        crc = binascii.crc32(file.getbuffer())
-        file.write(struct.pack('<I', crc))
+    def write_crc(self, m: Map, file: CrcWriter):
+        file.write(struct.pack('<I', file.crc))
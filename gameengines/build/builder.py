@@ -0,0 +1,156 @@
+import numpy as np
+
+from gameengines.build.map import Map, make_records
+from gameengines.build.portals import link_portals
+from gameengines.build.spatial import SectorIndex, get_ranks
+
+
+class MapBuilder:
+
+    """
+    Build a columnar map from whole arrays of geometry at a time. Wall
+    pointers, wall counts and loop links are assigned as sectors are added,
+    and portals are linked between walls that meet when the map is built.
+
+    Field overrides for sectors, walls and sprites are passed as dicts of
+    field name to either a scalar or an array with one value per record.
+
+    """
+
+    def __init__(self, map_cls: type[Map] = Map):
+        self.map_cls = map_cls
+        self.sectors = []
+        self.walls = []
+        self.sprites = []
+        self.unplaced_sprites = []
+        self.num_sectors = 0
+        self.num_walls = 0
+        self.num_sprites = 0
+
+    def add_polygons(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        loop_sizes: np.ndarray,
+        loops_per_sector: np.ndarray | None = None,
+        sector: dict | None = None,
+        wall: dict | None = None,
+    ) -> np.ndarray:
+        """
+        Add sectors from a flat run of vertices split into closed loops. Each
+        sector takes the next loops_per_sector loops, one each by default, with
+        its outer loop first. Outer loops run clockwise and holes anticlockwise,
+        as seen with y pointing down as in Build. Returns the new sector numbers.
+
+        """
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+        loop_sizes = np.asarray(loop_sizes, dtype=np.int64)
+        if loops_per_sector is None:
+            loops_per_sector = np.ones(len(loop_sizes), dtype=np.int64)
+        loops_per_sector = np.asarray(loops_per_sector, dtype=np.int64)
+        if len(x) != len(y) or len(x) != loop_sizes.sum():
+            raise ValueError('Vertex count does not match the loop sizes')
+        if loops_per_sector.sum() != len(loop_sizes):
+            raise ValueError('Loop count does not match the loops per sector')
+        if (loop_sizes < 3).any() or (loops_per_sector < 1).any():
+            raise ValueError('Every loop needs at least 3 walls and every sector at least 1 loop')
+
+        # Each wall's point2 is the next wall around its own loop.
+        loop_starts = np.repeat(np.cumsum(loop_sizes) - loop_sizes, loop_sizes)
+        point2 = loop_starts + (get_ranks(loop_sizes) + 1) % np.repeat(loop_sizes, loop_sizes)
+
+        first_loops = np.cumsum(loops_per_sector) - loops_per_sector
+        wallnum = np.add.reduceat(loop_sizes, first_loops) if len(loop_sizes) else loop_sizes
+        wallptr = np.cumsum(wallnum) - wallnum
+
+        sectors = make_records(self.map_cls.sector_cls, self.map_cls.get_sector_dtype(), len(wallnum), sector)
+        sectors['wallptr'] = self.num_walls + wallptr
+        sectors['wallnum'] = wallnum
+        walls = make_records(self.map_cls.wall_cls, self.map_cls.get_wall_dtype(), len(x), wall)
+        walls['x'] = x
+        walls['y'] = y
+        walls['point2'] = self.num_walls + point2
+
+        result = np.arange(self.num_sectors, self.num_sectors + len(sectors))
+        self.sectors.append(sectors)
+        self.walls.append(walls)
+        self.num_sectors += len(sectors)
+        self.num_walls += len(walls)
+        return result
+
+    def add_grid(
+        self,
+        columns: int,
+        rows: int,
+        size: int,
+        origin: tuple[int, int] = (0, 0),
+        mask: np.ndarray | None = None,
+        sector: dict | None = None,
+        wall: dict | None = None,
+    ) -> np.ndarray:
+        """
+        Add a square sector for each cell of a rows by columns grid, or just
+        the cells set in a (rows, columns) mask. Sectors are numbered row by
+        row and their walls run from the top left corner clockwise. Returns
+        the new sector numbers.
+
+        """
+        cells = np.ones((rows, columns), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        if cells.shape != (rows, columns):
+            raise ValueError(f'Mask shape {cells.shape} does not match the grid ({rows}, {columns})')
+        row, column = np.nonzero(cells)
+        x = origin[0] + column[:, None] * size + np.array([0, size, size, 0])
+        y = origin[1] + row[:, None] * size + np.array([0, 0, size, size])
+        return self.add_polygons(x.ravel(), y.ravel(), np.full(len(row), 4), sector=sector, wall=wall)
+
+    def add_sprites(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray | int = 0,
+        sectnum: np.ndarray | None = None,
+        sprite: dict | None = None,
+    ) -> np.ndarray:
+        """
+        Add sprites at the given positions. Without sectnum, each sprite is
+        placed in whichever sector contains it once the map is built, or -1
+        if none does. Returns the new sprite numbers.
+
+        """
+        x = np.asarray(x, dtype=np.int64)
+        sprites = make_records(self.map_cls.sprite_cls, self.map_cls.get_sprite_dtype(), len(x), sprite)
+        sprites['x'] = x
+        sprites['y'] = y
+        sprites['z'] = z
+        result = np.arange(self.num_sprites, self.num_sprites + len(sprites))
+        if sectnum is None:
+            self.unplaced_sprites.append(result)
+        else:
+            sprites['sectnum'] = sectnum
+        self.sprites.append(sprites)
+        self.num_sprites += len(sprites)
+        return result
+
+    def build(self, header=None, link: bool = True) -> Map:
+        """
+        Return everything added so far as a columnar map, ready to pass
+        straight to a writer.
+
+        """
+        limit = np.iinfo(self.map_cls.get_sector_dtype()['wallptr']).max + 1
+        if self.num_walls > limit:
+            raise ValueError(f'{self.num_walls} walls is more than the format can address ({limit})')
+        m = self.map_cls(
+            header if header is not None else self.map_cls.header_cls(),
+            np.concatenate(self.sectors) if self.sectors else np.empty(0, self.map_cls.get_sector_dtype()),
+            np.concatenate(self.walls) if self.walls else np.empty(0, self.map_cls.get_wall_dtype()),
+            np.concatenate(self.sprites) if self.sprites else np.empty(0, self.map_cls.get_sprite_dtype()),
+        )
+        if link:
+            link_portals(m)
+        if self.unplaced_sprites:
+            sprites = np.concatenate(self.unplaced_sprites)
+            index = SectorIndex(m)
+            m.sprites['sectnum'][sprites] = index.find_many(m.sprites['x'][sprites], m.sprites['y'][sprites])
+        return m
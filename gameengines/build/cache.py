@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+import numpy as np
+
+from gameengines.build.grp import Grp
+from gameengines.build.palette import Palette
+
+
+# Build treats this palette index as see-through.
+TRANSPARENT_INDEX = 255
+
+
+class TileCache:
+
+    """
+    Bounded LRU cache of decoded tiles and their palettized colours. Entries
+    are evicted least recently used first once the total size of the cached
+    arrays goes over max_bytes. Cached arrays are read-only and shared between
+    callers.
+
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable, factory: Callable[[], np.ndarray]) -> np.ndarray:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        # Decode outside the lock so slow misses don't block hits.
+        value = factory()
+        value.flags.writeable = False
+        with self.lock:
+            if key not in self.entries and value.nbytes <= self.max_bytes:
+                self.entries[key] = value
+                self.num_bytes += value.nbytes
+                self.evict()
+        return value
+
+    def evict(self):
+        while self.num_bytes > self.max_bytes:
+            _, value = self.entries.popitem(last=False)
+            self.num_bytes -= value.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.num_bytes = 0
+
+    @staticmethod
+    def get_archive_key(grp: Grp) -> str:
+        return os.path.normcase(os.path.abspath(grp.file_path))
+
+    def get_indices(self, grp: Grp, tilenum: int) -> np.ndarray:
+        key = (self.get_archive_key(grp), tilenum)
+        return self.get(key, lambda: np.array(grp.get_tile(tilenum)))
+
+    def get_colors(self, grp: Grp, tilenum: int, palette: Palette, shade: int = 0, alpha: bool = False) -> np.ndarray:
+        """
+        Return a tile as RGB, or RGBA with palette index 255 transparent.
+
+        """
+        def factory():
+            indices = self.get_indices(grp, tilenum)
+            colors = palette.apply(indices, shade)
+            if alpha:
+                opacity = np.where(indices == TRANSPARENT_INDEX, 0, 255).astype(np.uint8)
+                colors = np.concatenate((colors, opacity[..., np.newaxis]), axis=-1)
+            return colors
+
+        key = (self.get_archive_key(grp), tilenum, palette, shade, alpha)
+        return self.get(key, factory)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from gameengines.build.art import TileAtlas
+from gameengines.build.grp import Grp
+from gameengines.build.palette import Palette
+
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever the layout of a cache entry changes.
+CACHE_VERSION = 1
+
+MANIFEST_NAME = 'manifest.json'
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str | os.PathLike) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class Assets:
+
+    atlas: TileAtlas
+    palette: Palette | None = None
+
+
+class AssetCache:
+
+    """
+    On-disk cache of the decoded tile atlas and palette of a GRP. Each archive
+    gets a directory of .npy files that are memory-mapped on load, plus a
+    manifest recording the size, mtime and content hash of the source.
+
+    A matching size and mtime is trusted as is. If either differs, the archive
+    is rehashed and the entry is only rebuilt when the content has changed.
+
+    """
+
+    def __init__(self, cache_dir: str | os.PathLike, palette_name: str = 'PALETTE.DAT'):
+        self.cache_dir = Path(cache_dir)
+        self.palette_name = palette_name
+
+    def get_entry_dir(self, file_path: str | os.PathLike) -> Path:
+        path = os.path.normcase(os.path.abspath(file_path))
+        key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir.joinpath(f'{Path(file_path).stem}-{key}')
+
+    def read_manifest(self, entry_dir: Path) -> dict | None:
+        try:
+            with open(entry_dir.joinpath(MANIFEST_NAME), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != CACHE_VERSION:
+            return None
+        return manifest
+
+    def write_manifest(self, entry_dir: Path, manifest: dict):
+
+        # Written last and swapped in whole, so an entry is never seen half
+        # written.
+        temp_path = entry_dir.joinpath(MANIFEST_NAME + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, entry_dir.joinpath(MANIFEST_NAME))
+
+    def is_valid(self, file_path: str | os.PathLike, manifest: dict | None) -> bool:
+        if manifest is None:
+            return False
+        stat = os.stat(file_path)
+        if manifest['size'] == stat.st_size and manifest['mtime_ns'] == stat.st_mtime_ns:
+            return True
+        if manifest['size'] != stat.st_size or manifest['sha256'] != hash_file(file_path):
+            return False
+
+        # Touched but unchanged, so just record the new mtime.
+        manifest['mtime_ns'] = stat.st_mtime_ns
+        self.write_manifest(self.get_entry_dir(file_path), manifest)
+        return True
+
+    def load(self, file_path: str | os.PathLike) -> Assets:
+        entry_dir = self.get_entry_dir(file_path)
+        manifest = self.read_manifest(entry_dir)
+        if not self.is_valid(file_path, manifest):
+            logger.debug(f'Rebuilding asset cache for: {file_path}')
+            manifest = self.build(file_path, entry_dir)
+        return self.read(entry_dir, manifest)
+
+    def build(self, file_path: str | os.PathLike, entry_dir: Path) -> dict:
+        stat = os.stat(file_path)
+        sha256 = hash_file(file_path)
+        with Grp() as grp:
+            grp.load_atlas(file_path)
+            atlas = grp.atlas
+            palette = None
+            if self.palette_name in grp:
+                palette = Palette()
+                palette.load(grp.view(self.palette_name))
+        arrays = {
+            'pixels': atlas.pixels,
+            'offsets': atlas.offsets,
+            'widths': atlas.widths,
+            'heights': atlas.heights,
+        }
+        if palette is not None:
+            arrays['palette'] = palette.data
+            arrays['shades'] = palette.shades
+            if palette.translucency is not None:
+                arrays['translucency'] = palette.translucency
+
+        # Build the entry alongside the old one then swap it in.
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir))
+        for name, array in arrays.items():
+            np.save(temp_dir.joinpath(f'{name}.npy'), array)
+        manifest = {
+            'version': CACHE_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+            'tilestart': atlas.tilestart,
+            'arrays': list(arrays),
+        }
+        self.write_manifest(temp_dir, manifest)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(temp_dir, entry_dir)
+        return manifest
+
+    def read(self, entry_dir: Path, manifest: dict) -> Assets:
+        arrays = {
+            name: np.load(entry_dir.joinpath(f'{name}.npy'), mmap_mode='r')
+            for name in manifest['arrays']
+        }
+        atlas = TileAtlas(
+            arrays['pixels'],
+            arrays['offsets'],
+            arrays['widths'],
+            arrays['heights'],
+            manifest['tilestart'],
+        )
+        palette = None
+        if 'palette' in arrays:
+            palette = Palette()
+            palette.data = arrays['palette']
+            palette.shades = arrays['shades']
+            palette.translucency = arrays.get('translucency')
+            palette.table = palette.data[palette.shades]
+        return Assets(atlas, palette)
@@ -0,0 +1,127 @@
+import numpy as np
+
+from gameengines.build.map import Map
+from gameengines.build.spatial import get_ranks, get_wall_sectors
+
+
+class SectorGraph:
+
+    """
+    Sector adjacency through portal walls, held in compressed sparse row
+    form. The neighbours of sector s are indices[indptr[s]:indptr[s + 1]],
+    sorted and without duplicates.
+
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_edges(cls, num_sectors: int, sources: np.ndarray, targets: np.ndarray) -> 'SectorGraph':
+        valid = (sources >= 0) & (sources < num_sectors) & (targets >= 0) & (targets < num_sectors)
+        keys = np.unique(sources[valid] * num_sectors + targets[valid])
+        sources, targets = np.divmod(keys, num_sectors)
+        indptr = np.zeros(num_sectors + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_sectors), out=indptr[1:])
+        return cls(indptr, targets)
+
+    @classmethod
+    def from_map(cls, m: Map) -> 'SectorGraph':
+        """
+        Build the graph from each wall's nextsector. Links to sectors that
+        don't exist are ignored.
+
+        """
+        m = m.to_columnar()
+        num_sectors = len(m.sectors)
+        wallptr = m.sectors['wallptr'].astype(np.int64)
+        wallnum = m.sectors['wallnum'].astype(np.int64)
+        sources = get_wall_sectors(wallptr, wallnum, len(m.walls))
+        targets = m.walls['nextsector'].astype(np.int64)
+        return cls.from_edges(num_sectors, sources, targets)
+
+    def neighbours(self, sector: int) -> np.ndarray:
+        return self.indices[self.indptr[sector]:self.indptr[sector + 1]]
+
+    def expand(self, frontier: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return every (source, neighbour) pair leaving the frontier.
+
+        """
+        counts = self.indptr[frontier + 1] - self.indptr[frontier]
+        sources = np.repeat(frontier, counts)
+        targets = self.indices[np.repeat(self.indptr[frontier], counts) + get_ranks(counts)]
+        return sources, targets
+
+    def bfs(self, start: int | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Breadth-first search from one or more sectors, a whole frontier at a
+        time. Returns the portal distance to every sector and the sector it
+        was first reached from, both -1 where unreachable.
+
+        """
+        distances = np.full(len(self), -1, dtype=np.int64)
+        parents = np.full(len(self), -1, dtype=np.int64)
+        frontier = np.unique(np.atleast_1d(np.asarray(start, dtype=np.int64)))
+        distances[frontier] = 0
+        distance = 0
+        while len(frontier):
+            distance += 1
+            sources, targets = self.expand(frontier)
+            unvisited = distances[targets] < 0
+            targets, first = np.unique(targets[unvisited], return_index=True)
+            distances[targets] = distance
+            parents[targets] = sources[unvisited][first]
+            frontier = targets
+        return distances, parents
+
+    def reachable(self, start: int | np.ndarray) -> np.ndarray:
+        return self.bfs(start)[0] >= 0
+
+    def reachable_from_start(self, m: Map) -> np.ndarray:
+        """
+        Return which sectors can be reached from the player start.
+
+        """
+        if not 0 <= m.header.cursectnum < len(self):
+            return np.zeros(len(self), dtype=bool)
+        return self.reachable(m.header.cursectnum)
+
+    def shortest_path(self, start: int, end: int) -> list[int] | None:
+        """
+        Return the sectors along a shortest portal path from start to end,
+        inclusive, or None if end can't be reached.
+
+        """
+        distances, parents = self.bfs(start)
+        if distances[end] < 0:
+            return None
+        path = [end]
+        while path[-1] != start:
+            path.append(int(parents[path[-1]]))
+        return path[::-1]
+
+    def connected_components(self) -> np.ndarray:
+        """
+        Label each sector with the lowest numbered sector it's connected to,
+        ignoring portal direction.
+
+        """
+        counts = np.diff(self.indptr)
+        sources = np.repeat(np.arange(len(self)), counts)
+        targets = self.indices
+        labels = np.arange(len(self))
+        while True:
+            previous = labels
+            labels = labels.copy()
+            np.minimum.at(labels, sources, labels[targets])
+            np.minimum.at(labels, targets, labels[sources])
+
+            # Jump to the label's label to shortcut long chains.
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                return labels
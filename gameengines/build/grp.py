@@ -1,136 +1,414 @@
-import ctypes
+import concurrent.futures
 import io
 import logging
+import mmap
+import os
+import shutil
 import struct
+import tempfile
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import BinaryIO
 
 import numpy as np
 
-from gameengines.build.structures import ArtHeader, StructureBase
+from gameengines.build.art import ArtFile, TileAtlas, load_atlas, read_atlas
 
 
 logger = logging.getLogger(__name__)
 
 
+GRP_MAGIC = b'KenSilverman'
+
+# Each directory entry is a null-padded name followed by the member's size.
+GRP_ENTRY_DTYPE = np.dtype([('name', 'S12'), ('size', '<u4')])
+
+GRP_NAME_LENGTH = 12
+
+
+@dataclass
+class GrpEntry:
+
+    name: str
+    offset: int
+    size: int
+
+
+class GrpMemberFile(io.RawIOBase):
+
+    """
+    Read-only file object over a single member of a GRP archive.
+
+    """
+
+    def __init__(self, file_path: str, entry: GrpEntry):
+        super().__init__()
+        self.file = open(file_path, 'rb')
+        self.entry = entry
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self.entry.size - self.position)
+        if size <= 0:
+            return 0
+        self.file.seek(self.entry.offset + self.position)
+        num_read = self.file.readinto(memoryview(buffer)[:size])
+        if not num_read:
+            raise EOFError(f'GRP member {self.entry.name} is truncated: expected {self.entry.size} bytes, got {self.position}')
+        self.position += num_read
+        return num_read
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.entry.size
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
 class Grp:
 
     def __init__(self):
         self.arts = []
         self.textures = []
         self.maps = []
+        self.atlas = None
+        self.file_path = None
+        self.entries = {}
+        self.buffer = None
+        self.mapping = None
+        self.art_files = None
 
-    def load(self, file_path: str):
+    def __enter__(self) -> 'Grp':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name.upper() in self.entries
+
+    @property
+    def names(self) -> list[str]:
+        return [entry.name for entry in self.entries.values()]
+
+    def index(self, file_path: str):
+        """
+        Read the GRP directory only. Member offsets are the cumulative sum of
+        the sizes before them, so no member data needs to be touched.
+
+        """
         with open(file_path, 'rb') as f:
             magic = f.read(12).rstrip(b'\0')
-            if magic != b'KenSilverman':
+            if magic != GRP_MAGIC:
                 raise ValueError('Not a GRP file')
-
             numfiles = struct.unpack('<I', f.read(4))[0]
+            raw = f.read(numfiles * GRP_ENTRY_DTYPE.itemsize)
+        if len(raw) < numfiles * GRP_ENTRY_DTYPE.itemsize:
+            raise EOFError('GRP directory is truncated')
+        table = np.frombuffer(raw, dtype=GRP_ENTRY_DTYPE)
+
+        sizes = table['size'].astype(np.int64)
+        offsets = (numfiles + 1) * GRP_ENTRY_DTYPE.itemsize + np.cumsum(sizes) - sizes
+        self.file_path = file_path
+        self.entries = {}
+        # Tiles from an earlier load may still view the old mapping, so it is
+        # left to be unmapped once the last of them goes rather than closed.
+        self.buffer = None
+        self.mapping = None
+        self.art_files = None
+        for name, offset, size in zip(table['name'].tolist(), offsets.tolist(), sizes.tolist()):
+            name = name.rstrip(b'\0').decode('ascii')
+            self.entries[name.upper()] = GrpEntry(name, offset, size)
+
+    def get_entry(self, name: str) -> GrpEntry:
+        try:
+            return self.entries[name.upper()]
+        except KeyError:
+            raise FileNotFoundError(f'{name} not found in GRP') from None
+
+    def open(self, name: str) -> BinaryIO:
+        return io.BufferedReader(GrpMemberFile(self.file_path, self.get_entry(name)))
+
+    def read(self, name: str) -> bytes:
+        entry = self.get_entry(name)
+        with open(self.file_path, 'rb') as f:
+            f.seek(entry.offset)
+            data = f.read(entry.size)
+        if len(data) != entry.size:
+            raise EOFError(f'GRP member {entry.name} is truncated: expected {entry.size} bytes, got {len(data)}')
+        return data
+
+    def extract(self, name: str, dest_dir: str | os.PathLike, fd: int | None = None, chunk_size: int = 1024 * 1024) -> str:
+        """
+        Write a single member out to dest_dir. Given a shared file descriptor
+        the member is read with os.pread, which doesn't touch the shared file
+        position, otherwise the archive is opened separately.
+
+        """
+        entry = self.get_entry(name)
+        file_name = os.path.basename(entry.name)
+        if not file_name or file_name in (os.curdir, os.pardir):
+            raise ValueError(f'Invalid GRP member name: {entry.name}')
+        file_path = os.path.join(dest_dir, file_name)
+        written = 0
+        with open(file_path, 'wb') as out:
+            if fd is not None:
+                while written < entry.size:
+                    chunk = os.pread(fd, min(chunk_size, entry.size - written), entry.offset + written)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    written += len(chunk)
+            else:
+                with open(self.file_path, 'rb') as f:
+                    f.seek(entry.offset)
+                    while written < entry.size:
+                        chunk = f.read(min(chunk_size, entry.size - written))
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        written += len(chunk)
+        if written != entry.size:
+            raise EOFError(f'GRP member {entry.name} is truncated: expected {entry.size} bytes, got {written}')
+        return file_path
+
+    def extract_all(self, dest_dir: str | os.PathLike, max_workers: int | None = None) -> list[str]:
+        """
+        Write every member out to dest_dir using a thread pool. Each worker
+        seeks and reads its own member, sharing one descriptor via os.pread
+        where the platform has it.
+
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        fd = os.open(self.file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0)) if hasattr(os, 'pread') else None
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self.extract, name, dest_dir, fd) for name in self.names]
+                return [future.result() for future in futures]
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def view(self, name: str) -> memoryview:
+        """
+        Return a member as a slice of the memory-mapped archive. The archive is
+        mapped on first use and nothing is copied.
+
+        """
+        entry = self.get_entry(name)
+        if self.mapping is None:
+            with open(self.file_path, 'rb') as f:
+                self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.mapping = memoryview(self.buffer)
+        return self.mapping[entry.offset:entry.offset + entry.size]
+
+    def close(self):
+        """
+        Release the memory-mapped archive, if it was mapped. Member views and
+        anything decoded from them without a copy, such as the tiles from
+        get_art, must be dropped first or closing the mapping raises
+        BufferError.
+
+        """
+        if self.art_files is not None:
+            for art_file in self.art_files:
+                art_file.close()
+            self.art_files = None
+        if self.mapping is not None:
+            self.mapping.release()
+            self.mapping = None
+        if self.buffer is not None:
+            try:
+                self.buffer.close()
+            except BufferError:
+                # Leave the archive mapped and usable so close can be retried.
+                self.mapping = memoryview(self.buffer)
+                raise
+            self.buffer = None
+
+    def get_art(self, name: str) -> list[np.ndarray]:
+        return self.load_art(self.view(name))
+
+    def get_art_file(self, name: str) -> ArtFile:
+        return ArtFile(self.view(name))
+
+    def get_tile(self, tilenum: int) -> np.ndarray:
+        """
+        Decode a single tile by its global tile number. Only the headers and
+        tables of the ART members are read to find it.
+
+        """
+        if self.art_files is None:
+            self.art_files = [self.get_art_file(name) for name in self.art_names]
+        for art_file in self.art_files:
+            if tilenum in art_file:
+                return art_file[tilenum]
+        raise IndexError(f'Tile {tilenum} not in GRP')
+
+    def get_art_atlas(self, name: str) -> TileAtlas:
+        return load_atlas(self.view(name))
+
+    @property
+    def art_names(self) -> list[str]:
+        return [name for name in self.names if name.lower().endswith('.art')]
+
+    def load(self, file_path: str):
+        """
+        Decode every ART file in the archive into textures. The pixels are
+        copied out, so the textures outlive the memory-mapped archive.
+
+        """
+        self.index(file_path)
+        atlases = []
+        for name in self.art_names:
+            logger.debug(f'Loading art: {name}')
+            atlases.append(self.get_art_atlas(name))
+        atlas = TileAtlas.concatenate(atlases)
+        self.textures.extend(atlas[i] for i in range(len(atlas)))
+
+    def load_atlas(self, file_path: str):
+        """
+        Decode every ART file in the archive into a single tile atlas.
+
+        """
+        self.index(file_path)
+        atlases = []
+        for name in self.art_names:
+            logger.debug(f'Loading art: {name}')
+            atlases.append(self.get_art_atlas(name))
+        self.atlas = TileAtlas.concatenate(atlases)
+
+    def load_parallel(
+        self,
+        file_path: str,
+        max_workers: int | None = None,
+        executor_cls: type[concurrent.futures.Executor] = concurrent.futures.ProcessPoolExecutor,
+    ):
+        """
+        Decode every ART file in the archive concurrently, one member per task,
+        and merge the results into a single atlas in tile number order.
+
+        Process workers read their own member from disk so that only decoded
+        tiles cross the process boundary. Thread workers decode straight from
+        the memory-mapped archive.
+
+        """
+        self.index(file_path)
+        with executor_cls(max_workers=max_workers) as executor:
+            if issubclass(executor_cls, concurrent.futures.ThreadPoolExecutor):
+                futures = [executor.submit(load_atlas, self.view(name)) for name in self.art_names]
+            else:
+                futures = [
+                    executor.submit(read_atlas, file_path, entry.offset, entry.size)
+                    for entry in map(self.get_entry, self.art_names)
+                ]
+            atlases = [future.result() for future in futures]
+        atlases.sort(key=lambda atlas: atlas.tilestart)
+        self.atlas = TileAtlas.concatenate(atlases)
+        self.textures.extend(self.atlas[i] for i in range(len(self.atlas)))
+
+    def load_art(self, data) -> list[np.ndarray]:
+        atlas = load_atlas(data)
+        return [atlas[i] for i in range(len(atlas))]
+
+
+class GrpWriter:
+
+    """
+    Write a GRP archive from (name, source) pairs, where a source is a path,
+    a bytes-like object or a binary file object. Member data is streamed in
+    bounded chunks, so the archive is never held in memory.
+
+    Member sizes must be known before the directory is written. Paths are
+    stat'ed and seekable files are measured in place. Anything else is
+    spooled to a temporary file first.
+
+    """
+
+    def __init__(self, chunk_size: int = 1024 * 1024):
+        self.chunk_size = chunk_size
+
+    def __call__(self, members: Iterable[tuple[str, str | os.PathLike | bytes | memoryview | BinaryIO]], file: BinaryIO):
+        spooled = []
+        try:
             entries = []
-            for _ in range(numfiles):
-                name = f.read(12).decode('ascii').rstrip('\0')
-                size = struct.unpack('<I', f.read(4))[0]
-                entries.append((name, size))
-
-            for name, size in entries:
-                #print('FOUND:', name)
-                data = f.read(size)
-                if name.lower().endswith('.art'):
-                    self.textures.extend(self.load_art(data))
-                #     print('FOUND:', name)
-                #     data = f.read(size)
-                #     #art_files.append(data)
-                #     # return data
-                # else:
-                #     f.seek(size, 1)
-
-
-                #entries.append(GRPEntry(name=name, size=size, data=data))
-
-        #     numfiles = struct.unpack('<I', f.read(4))[0]
-        #     entries = []
-        #     for _ in range(numfiles):
-        #         name = f.read(12).decode('ascii').rstrip('\0')
-        #         size = struct.unpack('<I', f.read(4))[0]
-        #         entries.append((name, size))
-        #
-        #     for name, size in entries:
-        #         data = f.read(size)
-        #         if name.lower().endswith('.art'):
-        #             logger.debug(f'Loading art: {name}')
-        #             self.load_art(data)
-        #
-        #         #print(name, size)
-        #         # if name.lower() == target_filename.lower():
-        #         #     #data = f.read(size)
-        #         #     #return data
-        #         # else:
-        #         f.seek(size, 1)
-        # #raise FileNotFoundError(f'{target_filename} not found in GRP')
-
-
-    # def get_art_files(grp_path):
-    #
-    #     art_files = []
-    #
-    #     # TODO: Move to duke tools.
-    #     with open(grp_path, 'rb') as f:
-    #         magic = f.read(12).rstrip(b'\0')
-    #         if magic != b'KenSilverman':
-    #             raise ValueError('Not a GRP file')
-    #
-    #         numfiles = struct.unpack('<I', f.read(4))[0]
-    #         entries = []
-    #         for _ in range(numfiles):
-    #             name = f.read(12).decode('ascii').rstrip('\0')
-    #             size = struct.unpack('<I', f.read(4))[0]
-    #             entries.append((name, size))
-    #
-    #         for name, size in entries:
-    #             if name.lower().endswith('.art'):
-    #                 print('FOUND:', name)
-    #                 data = f.read(size)
-    #                 art_files.append(data)
-    #                 #return data
-    #             else:
-    #                 f.seek(size, 1)
-    #
-    #     return art_files
-    #     #raise FileNotFoundError(f'{target_filename} not found in GRP')
-
-    def load_art(self, data):
-
-        textures = []
-        #palette = load_palette(palette_path)
-
-        # TODO: Scan grp file and extract all tiles.
-        #art_datas = get_art_files(grp_path)
-        #for art_data in art_datas:#[0:2]:
-        stream = io.BytesIO(data)
-        header = ArtHeader.from_stream(stream)
-
-        numtiles = header.localtileend - header.localtilestart
-
-        class ArtHeader2(StructureBase):
-
-            _fields_ = (
-                ('tilesizx',    ctypes.c_int16 * (numtiles + 1)),
-                ('tilesizy',    ctypes.c_int16 * (numtiles + 1)),
-                ('picanm',      ctypes.c_int32 * (numtiles + 1)),
-            )
-
-        header2 = ArtHeader2.from_stream(stream)
-
-
-        for i in range(numtiles):
-            w, h = header2.tilesizx[i], header2.tilesizy[i]
-            #print(i, '->', w, h)
-            indices = np.frombuffer(stream.read(w * h), dtype=np.uint8)
-            # try:
-            #     #array = indices.reshape((w , h))
-            #     #textures.append(palette[array])
-            # except Exception as e:
-            #     print(e)
-            #     pass
-            textures.append(indices.reshape((w, h)))
-
-        return textures
+            for name, source in members:
+                if hasattr(source, 'read') and not self.is_seekable(source):
+                    source = self.spool(source)
+                    spooled.append(source)
+                entries.append((self.get_name(name), source, self.get_size(source)))
+
+            directory = bytearray(struct.pack('<12sI', GRP_MAGIC, len(entries)))
+            for name, _, size in entries:
+                directory.extend(struct.pack('<12sI', name, size))
+            file.write(directory)
+            for _, source, size in entries:
+                self.write_member(file, source, size)
+        finally:
+            for source in spooled:
+                source.close()
+
+    @staticmethod
+    def get_name(name: str) -> bytes:
+        encoded = name.encode('ascii')
+        if len(encoded) > GRP_NAME_LENGTH:
+            raise ValueError(f'GRP member names are limited to {GRP_NAME_LENGTH} characters: {name}')
+        return encoded
+
+    @staticmethod
+    def is_seekable(source: BinaryIO) -> bool:
+        return getattr(source, 'seekable', lambda: False)()
+
+    def spool(self, source: BinaryIO) -> BinaryIO:
+        spooled = tempfile.SpooledTemporaryFile(max_size=self.chunk_size)
+        shutil.copyfileobj(source, spooled, self.chunk_size)
+        spooled.seek(0)
+        return spooled
+
+    @staticmethod
+    def get_size(source) -> int:
+        if isinstance(source, (str, os.PathLike)):
+            return os.path.getsize(source)
+        if hasattr(source, 'read'):
+            position = source.tell()
+            size = source.seek(0, io.SEEK_END) - position
+            source.seek(position)
+            return size
+        return memoryview(source).nbytes
+
+    def write_member(self, file: BinaryIO, source, size: int):
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                written = self.copy(f, file, size)
+        elif hasattr(source, 'read'):
+            written = self.copy(source, file, size)
+        else:
+            file.write(source)
+            written = size
+        if written != size:
+            raise EOFError(f'Member changed size while writing: expected {size} bytes, got {written}')
+
+    def copy(self, source: BinaryIO, file: BinaryIO, size: int) -> int:
+        remaining = size
+        while remaining > 0:
+            chunk = source.read(min(self.chunk_size, remaining))
+            if not chunk:
+                break
+            file.write(chunk)
+            remaining -= len(chunk)
+        return size - remaining
@@ -1,8 +1,95 @@
 import abc
+import functools
+import io
+import itertools
+import mmap
+import operator
+import re
 import struct
-from dataclasses import asdict, dataclass
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass, fields
 from typing import BinaryIO
 
+import numpy as np
+
+from gameengines.build.profiling import PhaseStats, Profiled
+
+
+# Struct format characters and their numpy equivalents. Map formats all use
+# standard sizes without alignment, so the resulting dtypes are packed.
+DTYPE_CODES = {
+    'b': 'i1',
+    'B': 'u1',
+    'c': 'S1',
+    'h': '<i2',
+    'H': '<u2',
+    'i': '<i4',
+    'I': '<u4',
+}
+
+
+@functools.cache
+def get_struct(fmt: str) -> struct.Struct:
+    return struct.Struct(fmt)
+
+
+@functools.cache
+def get_getter(record_cls: type) -> operator.attrgetter:
+    return operator.attrgetter(*(f.name for f in fields(record_cls)))
+
+
+@functools.cache
+def get_dtype(fmt: str, record_cls: type) -> np.dtype:
+    """
+    Build a packed structured dtype from a struct format string, naming each
+    field after the matching field on the record dataclass.
+
+    """
+    formats = []
+    for count, code in re.findall(r'(\d*)([a-zA-Z])', fmt.lstrip('<')):
+        if code == 's':
+            formats.append(f'S{count or 1}')
+        else:
+            formats.extend([DTYPE_CODES[code]] * int(count or 1))
+    names = [f.name for f in fields(record_cls)]
+    return np.dtype(list(zip(names, formats)))
+
+
+def records_to_array(records: list, dtype: np.dtype) -> np.ndarray:
+    getter = operator.attrgetter(*dtype.names)
+    return np.array([getter(record) for record in records], dtype=dtype)
+
+
+def make_records(record_cls: type, dtype: np.dtype, num_records: int, values: dict | None = None) -> np.ndarray:
+    """
+    Return a structured array of records set to the dataclass defaults, with
+    the given fields overridden by a scalar or one value per record.
+
+    """
+    array = np.empty(num_records, dtype=dtype)
+    array[:] = get_getter(record_cls)(record_cls())
+    for name, value in (values or {}).items():
+        array[name] = value
+    return array
+
+
+def remap_records(array: np.ndarray, record_cls: type, dtype: np.dtype) -> np.ndarray:
+    """
+    Copy a structured array into another record layout field by field, by
+    name. Fields the source doesn't have keep the dataclass defaults.
+
+    """
+    return make_records(record_cls, dtype, len(array), {
+        name: array[name] for name in dtype.names if name in array.dtype.names
+    })
+
+
+def array_to_records(array: np.ndarray, record_cls: type, extra_data: dict[int, bytes] | None = None) -> list:
+    records = [record_cls(*row) for row in array.tolist()]
+    for index, data in (extra_data or {}).items():
+        records[index].extra_data = data
+    return records
+
 
 @dataclass
 class Header:
@@ -103,6 +190,160 @@ class Sprite:
         self.extra_data = None
 
 
+class BufferReader:
+
+    """
+    Minimal read-only file interface over a buffer. Reads return memoryview
+    slices, so nothing is copied until it's decoded.
+
+    The position can be left pending on a lazy section whose size isn't known
+    yet. It's only worked out if something reads, seeks or tells after it.
+
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.view = memoryview(buffer).cast('B')
+        self.position = 0
+        self.pending = None
+
+    def __enter__(self) -> 'BufferReader':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def resolve(self):
+        if self.pending is not None:
+            self.position = self.pending.end
+            self.pending = None
+
+    def read(self, size: int = -1) -> memoryview:
+        self.resolve()
+        start = self.position
+        end = len(self.view) if size is None or size < 0 else min(start + size, len(self.view))
+        self.position = end
+        return self.view[start:end]
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self.resolve()
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self) -> int:
+        self.resolve()
+        return self.position
+
+    def close(self):
+        """
+        Release the view and close the buffer if it can be, eg an mmap.
+        Anything still viewing the buffer must be released first.
+
+        """
+        self.view.release()
+        if hasattr(self.buffer, 'close'):
+            self.buffer.close()
+
+
+class LazySection(Sequence):
+
+    """
+    Read-only sequence of records backed by a buffer. Each record is
+    decrypted and decoded the first time it's accessed, then kept so that
+    changes made to it stick.
+
+    Where records may carry extra data their offsets aren't known until the
+    section has been walked, which waits until a record is first accessed.
+    A section can start where the one before it ends, in which case reaching
+    its records walks that one too.
+
+    """
+
+    def __init__(
+        self,
+        reader: 'MapReaderBase',
+        view: memoryview,
+        start: 'int | LazySection',
+        num_records: int,
+        dtype: np.dtype,
+        fmt: str,
+        record_cls: type,
+        extra_size: int,
+        decrypt_key: int | None = None,
+    ):
+        self.reader = reader
+        self.view = view
+        self.previous = start if isinstance(start, LazySection) else None
+        self.start_offset = None if self.previous is not None else start
+        self.num_records = num_records
+        self.dtype = dtype
+        self.struct = get_struct(fmt)
+        self.record_cls = record_cls
+        self.extra_size = extra_size
+        self.decrypt_key = decrypt_key
+        self.record_offsets = None
+        self.size = None
+        self.records = {}
+
+    def __len__(self) -> int:
+        return self.num_records
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Record index out of range')
+        if index not in self.records:
+            self.records[index] = self.decode(index)
+        return self.records[index]
+
+    @property
+    def start(self) -> int:
+        if self.start_offset is None:
+            self.start_offset = self.previous.end
+            self.previous = None
+        return self.start_offset
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        Offset of each record from the start of the section.
+
+        """
+        if self.record_offsets is None:
+            self.record_offsets, self.size = self.reader.get_section_offsets(
+                self.view[self.start:],
+                self.num_records,
+                self.dtype,
+                self.extra_size,
+                self.decrypt_key,
+            )
+        return self.record_offsets
+
+    @property
+    def end(self) -> int:
+        if self.size is None and not self.extra_size:
+            self.size = self.num_records * self.dtype.itemsize
+        elif self.size is None:
+            self.offsets
+        return self.start + self.size
+
+    def decode(self, index: int):
+        offset = self.start + int(self.offsets[index])
+        end = offset + self.struct.size
+        data = self.reader.decrypt(bytearray(self.view[offset:end]), self.decrypt_key)
+        record = self.record_cls(*self.struct.unpack(data))
+        if record.extra > 0 and self.extra_size:
+            record.extra_data = bytes(self.view[end:end + self.extra_size])
+        return record
+
+
 class Map:
 
     header_fmt = '<iiiihh'
@@ -114,70 +355,421 @@ class Map:
     sprite_fmt = '<iiihhbBBBBBbbhhhhhhhhhh'
     sprite_cls = Sprite
 
-    def __init__(self, header=None, sectors=None, walls=None, sprites=None):
+    def __init__(self, header=None, sectors=None, walls=None, sprites=None, extra_data=None):
         self.header = header or self.header_cls()
-        self.sectors = sectors or []
-        self.walls = walls or []
-        self.sprites = sprites or []
+        self.sectors = sectors if sectors is not None else []
+        self.walls = walls if walls is not None else []
+        self.sprites = sprites if sprites is not None else []
+
+        # Columnar sections have nowhere to hang extra data off each record, so
+        # it lives here instead, keyed by section name and then record index.
+        self.extra_data = extra_data if extra_data is not None else {}
 
-    # @classmethod
-    # def from_map(cls, m: 'MapBase'):
-    #     new_header_field_names = [f.name for f in fields(cls.header_cls)]
-    #     new_header_data = {key: value for key, value in asdict(m.header).items() if key in new_header_field_names}
-    #     header = cls.header_cls(**new_header_data)
-    #     sectors = [cls.sector_cls(**asdict(sector)) for sector in m.sectors]
-    #     walls = [cls.wall_cls(**asdict(sector)) for sector in m.walls]
-    #     sprites = [cls.sprite_cls(**asdict(sector)) for sector in m.sprites]
-    #     return cls(header, sectors, walls, sprites)
+        # The buffer lazy sections read from, if it needs releasing.
+        self.source = None
 
+    def __enter__(self) -> 'Map':
+        return self
 
-class MapReaderBase(metaclass=abc.ABCMeta):
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Release the buffer behind a lazily read map. Records already decoded
+        stay usable; the rest can no longer be read.
+
+        """
+        if self.source is not None:
+            for section in (self.sectors, self.walls, self.sprites):
+                if isinstance(section, LazySection):
+                    section.view.release()
+            self.source.close()
+            self.source = None
+
+    @classmethod
+    def get_sector_dtype(cls) -> np.dtype:
+        return get_dtype(cls.sector_fmt, cls.sector_cls)
+
+    @classmethod
+    def get_wall_dtype(cls) -> np.dtype:
+        return get_dtype(cls.wall_fmt, cls.wall_cls)
+
+    @classmethod
+    def get_sprite_dtype(cls) -> np.dtype:
+        return get_dtype(cls.sprite_fmt, cls.sprite_cls)
+
+    @property
+    def columnar(self) -> bool:
+        return isinstance(self.sectors, np.ndarray)
+
+    def to_columnar(self) -> 'Map':
+        """
+        Return this map with each section held as a structured array. Returns
+        the map itself if it's already columnar.
+
+        """
+        if self.columnar:
+            return self
+        extra_data = {}
+        for name, records in (('sectors', self.sectors), ('walls', self.walls), ('sprites', self.sprites)):
+            extra_data[name] = {
+                index: record.extra_data
+                for index, record in enumerate(records)
+                if record.extra > 0 and record.extra_data is not None
+            }
+        return type(self)(
+            self.header,
+            records_to_array(self.sectors, self.get_sector_dtype()),
+            records_to_array(self.walls, self.get_wall_dtype()),
+            records_to_array(self.sprites, self.get_sprite_dtype()),
+            extra_data,
+        )
+
+    def to_records(self) -> 'Map':
+        """
+        Return this map with each section held as a list of dataclasses.
+        Returns the map itself if it's already in that form.
+
+        """
+        if not self.columnar:
+            return self
+        return type(self)(
+            self.header,
+            array_to_records(self.sectors, self.sector_cls, self.extra_data.get('sectors')),
+            array_to_records(self.walls, self.wall_cls, self.extra_data.get('walls')),
+            array_to_records(self.sprites, self.sprite_cls, self.extra_data.get('sprites')),
+        )
+
+    @classmethod
+    def from_map(cls, m: 'Map') -> 'Map':
+        """
+        Convert a map from another format into this one in a single pass over
+        each section, copying header and record fields across by name. The
+        result is columnar.
+
+        Extended record data only carries over between formats that have it.
+        Records converted into such a format that have extra set are given
+        blank extended data, and records converted out of one have extra
+        cleared, since it indexes extended data that no longer exists.
+
+        """
+        m = m.to_columnar()
+        header = cls.header_cls()
+        for f in fields(header):
+            if f.name not in ('signature', 'version') and hasattr(m.header, f.name):
+                setattr(header, f.name, getattr(m.header, f.name))
+        sections = {}
+        extra_data = {}
+        for name, dtype, record_cls in (
+            ('sector', cls.get_sector_dtype(), cls.sector_cls),
+            ('wall', cls.get_wall_dtype(), cls.wall_cls),
+            ('sprite', cls.get_sprite_dtype(), cls.sprite_cls),
+        ):
+            array = remap_records(getattr(m, f'{name}s'), record_cls, dtype)
+            source_size = getattr(m.header, f'x_{name}_size', 0)
+            extra_size = getattr(header, f'x_{name}_size', 0)
+            if not extra_size:
+                if source_size:
+                    array['extra'] = -1
+                section_extra_data = {}
+            else:
+                section_extra_data = {
+                    index: data
+                    for index, data in m.extra_data.get(f'{name}s', {}).items()
+                    if len(data) == extra_size
+                }
+                missing = np.flatnonzero(array['extra'] > 0)
+                missing = missing[~np.isin(missing, list(section_extra_data))]
+                section_extra_data.update(cls.make_extra_data(name, missing, extra_size))
+            sections[name] = array
+            extra_data[f'{name}s'] = section_extra_data
+            if hasattr(header, f'num{name}s'):
+                setattr(header, f'num{name}s', len(array))
+        return cls(header, sections['sector'], sections['wall'], sections['sprite'], extra_data)
+
+    @classmethod
+    def make_extra_data(cls, name: str, indices: np.ndarray, extra_size: int) -> dict[int, bytes]:
+        """
+        Return blank extended data for the given records of a section.
+
+        """
+        blank = bytes(extra_size)
+        return dict.fromkeys(indices.tolist(), blank)
+
+
+class MapReaderBase(Profiled, metaclass=abc.ABCMeta):
 
     """
     https://moddingwiki.shikadi.net/wiki/MAP_Format_(Build)
     https://fabiensanglard.net/duke3d/BUILDINF.TXT
 
+    An observer, if given, is passed PhaseStats for the header and each
+    section as they're read, and for each decryption step within them.
+
     """
 
+    operation = 'read'
+
+    def __init__(
+        self,
+        columnar: bool = False,
+        bulk: bool = True,
+        lazy: bool = False,
+        observer: Callable[[PhaseStats], None] | None = None,
+    ):
+        super().__init__(observer)
+        self.columnar = columnar
+        self.bulk = bulk
+        self.lazy = lazy
+        self.extra_data = {}
+
     @property
     def header_size(self):
-        return struct.calcsize(self.map_cls.header_fmt)
+        return get_struct(self.map_cls.header_fmt).size
 
     @property
     def sector_size(self):
-        return struct.calcsize(self.map_cls.sector_fmt)
+        return get_struct(self.map_cls.sector_fmt).size
 
     @property
     def wall_size(self):
-        return struct.calcsize(self.map_cls.wall_fmt)
+        return get_struct(self.map_cls.wall_fmt).size
 
     @property
     def sprite_size(self):
-        return struct.calcsize(self.map_cls.sprite_fmt)
+        return get_struct(self.map_cls.sprite_fmt).size
 
     @property
     @abc.abstractmethod
     def map_cls(cls):
         ...
 
-    def __call__(self, file: BinaryIO) -> Map:
+    def __call__(self, file: BinaryIO | bytes | memoryview) -> Map:
 
         # TODO: Convert all file vars to 'stream'
         # TODO: Maybe 'num_something' is actually a member on this class...
         # Would solve a slight artchitecture smell...
-        header = self.get_header(file)
-        num_sectors = self.get_num_sectors(file, header)
-        sectors = self.get_sectors(file, num_sectors, header)
-        num_walls = self.get_num_walls(file, header)
-        walls = self.get_walls(file, num_walls, header)
-        num_sprites = self.get_num_sprites(file, header)
-        sprites = self.get_sprites(file, num_sprites, header)
-        return self.map_cls(header, sectors, walls, sprites)
+        if not hasattr(file, 'read'):
+            file = BufferReader(file)
+        elif self.lazy and not isinstance(file, BufferReader):
+            file = BufferReader(file.read())
+        self.extra_data = {}
+        header = self.run_phase('header', self.get_header, file, file=file, records=1)
+        get = self.get_section
+        sectors = self.run_phase('sectors', get, file, header, self.get_num_sectors, self.get_sectors, file=file)
+        walls = self.run_phase('walls', get, file, header, self.get_num_walls, self.get_walls, file=file)
+        sprites = self.run_phase('sprites', get, file, header, self.get_num_sprites, self.get_sprites, file=file)
+        return self.map_cls(header, sectors, walls, sprites, self.extra_data if self.columnar else None)
+
+    def open(self, file_path: str) -> Map:
+        """
+        Memory-map a map file and read it. In lazy mode only the header is
+        parsed here and records are decoded on access, so the mapping stays
+        open until the map is closed, eg by using it as a context manager.
+        Otherwise the mapping is closed before returning.
+
+        """
+        with open(file_path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        reader = BufferReader(buffer)
+        if not self.lazy:
+            with reader:
+                return self(reader)
+        m = self(reader)
+        m.source = reader
+        return m
+
+    @staticmethod
+    def get_section(file: BinaryIO, header: Header, get_num: Callable, get: Callable) -> list | np.ndarray:
+        return get(file, get_num(file, header), header)
 
     @staticmethod
     def decrypt(data: bytearray, key: int | None) -> bytearray:
         return data
 
+    @classmethod
+    def decrypt_section(cls, data: bytes, record_size: int, key: int | None) -> bytes:
+        """
+        Decrypt a run of contiguous records. The key stream restarts for each
+        record, so this is the same as decrypting each record in turn.
+
+        """
+        if key is None:
+            return data
+        return b''.join(
+            cls.decrypt(bytearray(data[offset:offset + record_size]), key)
+            for offset in range(0, len(data), record_size)
+        )
+
+    def decrypt_records(self, data: bytes, record_size: int, key: int | None) -> bytes:
+        if key is None:
+            return self.decrypt_section(data, record_size, key)
+        return self.run_phase(
+            'decrypt', self.decrypt_section, data, record_size, key, nbytes=len(data), records=len(data) // max(record_size, 1),
+        )
+
+    def get_extra_size(self, header: Header, name: str) -> int:
+
+        # Only formats with extended records (ie Blood) declare their sizes.
+        return getattr(header, f'x_{name}_size', 0)
+
+    def read_section(
+        self,
+        file: BinaryIO,
+        num_records: int,
+        dtype: np.dtype,
+        extra_size: int,
+        decrypt_key: int | None = None,
+    ) -> tuple[bytes, dict[int, bytes]]:
+        """
+        Read a whole section with a single read and return its decrypted
+        records as one contiguous buffer. Any extra data interleaved with the
+        records is split out and returned keyed by record index.
+
+        """
+        record_size = dtype.itemsize
+        raw = file.read(num_records * record_size)
+        data = self.decrypt_records(raw, record_size, decrypt_key)
+        extra_data = {}
+        if not extra_size or not num_records:
+            return data, extra_data
+        indices = np.flatnonzero(np.frombuffer(data, dtype=dtype)['extra'] > 0)
+        if not len(indices):
+            return data, extra_data
+
+        # Everything after the first record with extra data was read at the
+        # wrong offsets. Walk the rest one record at a time, consuming what's
+        # already been read before going back to the file.
+        first = int(indices[0])
+        data = bytearray(data[:(first + 1) * record_size])
+        remaining = io.BytesIO(raw[(first + 1) * record_size:])
+
+        def take(size):
+            chunk = remaining.read(size)
+            if len(chunk) < size:
+                chunk += file.read(size - len(chunk))
+            return chunk
+
+        extra_dtype, extra_offset = dtype.fields['extra'][:2]
+        extra_fmt = '<' + extra_dtype.char
+        extra_data[first] = take(extra_size)
+        for index in range(first + 1, num_records):
+            record = self.decrypt(bytearray(take(record_size)), decrypt_key)
+            data.extend(record)
+            if struct.unpack_from(extra_fmt, record, extra_offset)[0] > 0:
+                extra_data[index] = take(extra_size)
+        return bytes(data), extra_data
+
+    def read_section_array(
+        self,
+        file: BinaryIO,
+        name: str,
+        num_records: int,
+        dtype: np.dtype,
+        header: Header,
+        decrypt_key: int | None = None,
+    ) -> np.ndarray:
+        data, self.extra_data[f'{name}s'] = self.read_section(
+            file,
+            num_records,
+            dtype,
+            self.get_extra_size(header, name),
+            decrypt_key,
+        )
+        return np.frombuffer(data, dtype=dtype).copy()
+
+    @staticmethod
+    def decrypt_field(data: np.ndarray, field_offset: int, key: int | None) -> np.ndarray:
+        """
+        Decrypt a batch of fields, one per row, that each sit at field_offset
+        within their record.
+
+        """
+        return data
+
+    def get_section_offsets(
+        self,
+        view: memoryview,
+        num_records: int,
+        dtype: np.dtype,
+        extra_size: int,
+        decrypt_key: int | None = None,
+    ) -> tuple[np.ndarray, int]:
+        """
+        Return the offset of each record in a section and the section's total
+        size, without decoding the records themselves.
+
+        """
+        record_size = dtype.itemsize
+        if not extra_size or not num_records:
+            return np.arange(num_records, dtype=np.int64) * record_size, num_records * record_size
+
+        # Record offsets depend on which earlier records carry extra data, so
+        # walk them, reading just the extra field at each record start. The key
+        # stream restarts for every record, so decrypting the field is the same
+        # XOR each time; get it once by decrypting zeros.
+        field_dtype, field_offset = dtype.fields['extra'][:2]
+        field_size = field_dtype.itemsize
+        mask = self.decrypt_field(np.zeros(field_size, dtype=np.uint8), field_offset, decrypt_key)
+        mask = int.from_bytes(mask.tobytes(), 'little')
+        sign_bit = 1 << (8 * field_size - 1) if field_dtype.kind == 'i' else 1 << (8 * field_size)
+        data = bytes(view[:num_records * (record_size + extra_size)])
+        offsets = np.empty(num_records, dtype=np.int64)
+        offset = 0
+        for index in range(num_records):
+            offsets[index] = offset
+            start = offset + field_offset
+            extra = int.from_bytes(data[start:start + field_size], 'little') ^ mask
+            has_extra = start + field_size <= len(data) and 0 < extra < sign_bit
+            offset += record_size + (extra_size if has_extra else 0)
+        return offsets, offset
+
+    def read_section_lazy(
+        self,
+        file: BufferReader,
+        name: str,
+        num_records: int,
+        fmt: str,
+        record_cls: type,
+        dtype: np.dtype,
+        header: Header,
+        decrypt_key: int | None = None,
+    ) -> LazySection:
+        """
+        Return a lazy section starting at the current position, which is
+        left pending on the section until something needs to know its size.
+
+        """
+        start = file.pending if file.pending is not None else file.tell()
+        extra_size = self.get_extra_size(header, name)
+        section = LazySection(self, file.view, start, num_records, dtype, fmt, record_cls, extra_size, decrypt_key)
+        file.pending = section
+        return section
+
+    def read_section_records(
+        self,
+        file: BinaryIO,
+        name: str,
+        num_records: int,
+        fmt: str,
+        record_cls: type,
+        dtype: np.dtype,
+        header: Header,
+        decrypt_key: int | None = None,
+    ) -> list:
+        data, extra_data = self.read_section(
+            file,
+            num_records,
+            dtype,
+            self.get_extra_size(header, name),
+            decrypt_key,
+        )
+        records = list(itertools.starmap(record_cls, get_struct(fmt).iter_unpack(data)))
+        for index, extra in extra_data.items():
+            records[index].extra_data = extra
+        return records
+
     def get_header(self, file: BinaryIO, decrypt_key: int | None = None) -> Header:
         data = bytearray(file.read(self.header_size))
         unpacked = struct.unpack(self.map_cls.header_fmt, self.decrypt(data, decrypt_key))
@@ -186,63 +778,153 @@ class MapReaderBase(metaclass=abc.ABCMeta):
     def get_num_sectors(self, file: BinaryIO, header: Header) -> int:
         return struct.unpack('<H', file.read(2))[0]
 
-    def get_sectors(self, file: BinaryIO, num_sectors: int, header: Header, decrypt_key: int | None = None) -> list[Sector]:
+    def get_sectors(self, file: BinaryIO, num_sectors: int, header: Header, decrypt_key: int | None = None) -> list[Sector] | np.ndarray:
+        if self.columnar:
+            return self.read_section_array(file, 'sector', num_sectors, self.map_cls.get_sector_dtype(), header, decrypt_key)
+        if self.lazy:
+            return self.read_section_lazy(
+                file,
+                'sector',
+                num_sectors,
+                self.map_cls.sector_fmt,
+                self.map_cls.sector_cls,
+                self.map_cls.get_sector_dtype(),
+                header,
+                decrypt_key,
+            )
+        if self.bulk:
+            return self.read_section_records(
+                file,
+                'sector',
+                num_sectors,
+                self.map_cls.sector_fmt,
+                self.map_cls.sector_cls,
+                self.map_cls.get_sector_dtype(),
+                header,
+                decrypt_key,
+            )
         sectors = []
+        extra_size = self.get_extra_size(header, 'sector')
         for _ in range(num_sectors):
             data = bytearray(file.read(self.sector_size))
             unpacked = struct.unpack(self.map_cls.sector_fmt, self.decrypt(data, decrypt_key))
-            sectors.append(self.map_cls.sector_cls(*unpacked))
+            sector = self.map_cls.sector_cls(*unpacked)
+            if sector.extra > 0 and extra_size:
+                sector.extra_data = bytes(file.read(extra_size))
+            sectors.append(sector)
         return sectors
 
     def get_num_walls(self, file: BinaryIO, header: Header) -> int:
         return struct.unpack('<H', file.read(2))[0]
 
-    def get_walls(self, file: BinaryIO, num_walls: int, header: Header, decrypt_key: int | None = None) -> list[Wall]:
+    def get_walls(self, file: BinaryIO, num_walls: int, header: Header, decrypt_key: int | None = None) -> list[Wall] | np.ndarray:
+        if self.columnar:
+            return self.read_section_array(file, 'wall', num_walls, self.map_cls.get_wall_dtype(), header, decrypt_key)
+        if self.lazy:
+            return self.read_section_lazy(
+                file,
+                'wall',
+                num_walls,
+                self.map_cls.wall_fmt,
+                self.map_cls.wall_cls,
+                self.map_cls.get_wall_dtype(),
+                header,
+                decrypt_key,
+            )
+        if self.bulk:
+            return self.read_section_records(
+                file,
+                'wall',
+                num_walls,
+                self.map_cls.wall_fmt,
+                self.map_cls.wall_cls,
+                self.map_cls.get_wall_dtype(),
+                header,
+                decrypt_key,
+            )
         walls = []
+        extra_size = self.get_extra_size(header, 'wall')
         for _ in range(num_walls):
             data = bytearray(file.read(self.wall_size))
             unpacked = struct.unpack(self.map_cls.wall_fmt, self.decrypt(data, decrypt_key))
-            walls.append(self.map_cls.wall_cls(*unpacked))
+            wall = self.map_cls.wall_cls(*unpacked)
+            if wall.extra > 0 and extra_size:
+                wall.extra_data = bytes(file.read(extra_size))
+            walls.append(wall)
         return walls
 
     def get_num_sprites(self, file: BinaryIO, header: Header) -> int:
         return struct.unpack('<H', file.read(2))[0]
 
-    def get_sprites(self, file: BinaryIO, num_sprites: int, header: Header, decrypt_key: int | None = None) -> list[Sprite]:
+    def get_sprites(self, file: BinaryIO, num_sprites: int, header: Header, decrypt_key: int | None = None) -> list[Sprite] | np.ndarray:
+        if self.columnar:
+            return self.read_section_array(file, 'sprite', num_sprites, self.map_cls.get_sprite_dtype(), header, decrypt_key)
+        if self.lazy:
+            return self.read_section_lazy(
+                file,
+                'sprite',
+                num_sprites,
+                self.map_cls.sprite_fmt,
+                self.map_cls.sprite_cls,
+                self.map_cls.get_sprite_dtype(),
+                header,
+                decrypt_key,
+            )
+        if self.bulk:
+            return self.read_section_records(
+                file,
+                'sprite',
+                num_sprites,
+                self.map_cls.sprite_fmt,
+                self.map_cls.sprite_cls,
+                self.map_cls.get_sprite_dtype(),
+                header,
+                decrypt_key,
+            )
         sprites = []
+        extra_size = self.get_extra_size(header, 'sprite')
         for _ in range(num_sprites):
             data = bytearray(file.read(self.sprite_size))
             unpacked = struct.unpack(self.map_cls.sprite_fmt, self.decrypt(data, decrypt_key))
             sprite = self.map_cls.sprite_cls(*unpacked)
-            if sprite.extra > 0:
-                sprite.extra_data = file.read(header.x_sprite_size)
+            if sprite.extra > 0 and extra_size:
+                sprite.extra_data = bytes(file.read(extra_size))
             sprites.append(sprite)
         return sprites
 
 
-class MapWriterBase(metaclass=abc.ABCMeta):
+class MapWriterBase(Profiled, metaclass=abc.ABCMeta):
 
     """
     https://moddingwiki.shikadi.net/wiki/mFormat_(Build)
     https://fabiensanglard.net/duke3d/BUILDINF.TXT
 
+    An observer, if given, is passed PhaseStats for the header and each
+    section as they're written, and for each encryption step within them.
+
     """
 
+    operation = 'write'
+
+    def __init__(self, bulk: bool = True, observer: Callable[[PhaseStats], None] | None = None):
+        super().__init__(observer)
+        self.bulk = bulk
+
     @property
     def header_size(self):
-        return struct.calcsize(self.map_cls.header_fmt)
+        return get_struct(self.map_cls.header_fmt).size
 
     @property
     def sector_size(self):
-        return struct.calcsize(self.map_cls.sector_fmt)
+        return get_struct(self.map_cls.sector_fmt).size
 
     @property
     def wall_size(self):
-        return struct.calcsize(self.map_cls.wall_fmt)
+        return get_struct(self.map_cls.wall_fmt).size
 
     @property
     def sprite_size(self):
-        return struct.calcsize(self.map_cls.sprite_fmt)
+        return get_struct(self.map_cls.sprite_fmt).size
 
     @property
     @abc.abstractmethod
@@ -250,18 +932,96 @@ class MapWriterBase(metaclass=abc.ABCMeta):
         ...
 
     def __call__(self, m: Map, file: BinaryIO):
-        self.write_header(m, file)
-        self.write_num_sectors(m, file)
-        self.write_sectors(m, file)
-        self.write_num_walls(m, file)
-        self.write_walls(m, file)
-        self.write_num_sprites(m, file)
-        self.write_sprites(m, file)
+        write = self.write_section_with_num
+        self.run_phase('header', self.write_header, m, file, file=file, records=1)
+        self.run_phase('sectors', write, m, file, self.write_num_sectors, self.write_sectors, file=file, records=len(m.sectors))
+        self.run_phase('walls', write, m, file, self.write_num_walls, self.write_walls, file=file, records=len(m.walls))
+        self.run_phase('sprites', write, m, file, self.write_num_sprites, self.write_sprites, file=file, records=len(m.sprites))
+
+    @staticmethod
+    def write_section_with_num(m: Map, file: BinaryIO, write_num: Callable, write: Callable):
+        write_num(m, file)
+        write(m, file)
 
     @staticmethod
     def encrypt(data: bytes, key: int | None) -> bytes:
         return data
 
+    @classmethod
+    def encrypt_section(cls, data: bytes, record_size: int, key: int | None) -> bytes:
+        """
+        Encrypt a run of contiguous records. The key stream restarts for each
+        record, so this is the same as encrypting each record in turn.
+
+        """
+        if key is None:
+            return data
+        return b''.join(
+            cls.encrypt(data[offset:offset + record_size], key)
+            for offset in range(0, len(data), record_size)
+        )
+
+    def encrypt_records(self, data: bytes, record_size: int, key: int | None) -> bytes:
+        if key is None:
+            return self.encrypt_section(data, record_size, key)
+        return self.run_phase(
+            'encrypt', self.encrypt_section, data, record_size, key, nbytes=len(data), records=len(data) // max(record_size, 1),
+        )
+
+    def write_section(
+        self,
+        file: BinaryIO,
+        data: bytes,
+        record_size: int,
+        extra_data: dict[int, bytes],
+        encrypt_key: int | None = None,
+    ):
+        """
+        Write a contiguous run of packed records, interleaving any extra data
+        after the record it belongs to.
+
+        """
+        data = self.encrypt_records(data, record_size, encrypt_key)
+        if not extra_data:
+            file.write(data)
+            return
+        view = memoryview(data)
+        section = bytearray(len(data) + sum(len(extra) for extra in extra_data.values()))
+        start = offset = 0
+        for index in sorted(extra_data):
+            end = (index + 1) * record_size
+            section[offset:offset + end - start] = view[start:end]
+            offset += end - start
+            section[offset:offset + len(extra_data[index])] = extra_data[index]
+            offset += len(extra_data[index])
+            start = end
+        section[offset:] = view[start:]
+        file.write(section)
+
+    def pack_section(self, records: list, fmt: str, record_cls: type) -> tuple[bytearray, dict[int, bytes]]:
+        """
+        Pack records into a single preallocated buffer, collecting the extra
+        data of any record that carries it.
+
+        """
+        packer = get_struct(fmt)
+        getter = get_getter(record_cls)
+        data = bytearray(packer.size * len(records))
+        extra_data = {}
+        for index, record in enumerate(records):
+            packer.pack_into(data, index * packer.size, *getter(record))
+            if record.extra > 0 and record.extra_data is not None:
+                extra_data[index] = record.extra_data
+        return data, extra_data
+
+    def write_section_records(self, file: BinaryIO, records: list, fmt: str, record_cls: type, encrypt_key: int | None = None):
+        data, extra_data = self.pack_section(records, fmt, record_cls)
+        self.write_section(file, data, get_struct(fmt).size, extra_data, encrypt_key)
+
+    def write_section_array(self, file: BinaryIO, m: Map, name: str, array: np.ndarray, dtype: np.dtype, encrypt_key: int | None = None):
+        data = np.ascontiguousarray(array, dtype=dtype).tobytes()
+        self.write_section(file, data, dtype.itemsize, m.extra_data.get(f'{name}s', {}), encrypt_key)
+
     def write_header(self, m: Map, file: BinaryIO, encrypt_key: int | None = None):
         data = asdict(m.header).values()
         packed = struct.pack(self.map_cls.header_fmt, *data)
@@ -272,6 +1032,12 @@ class MapWriterBase(metaclass=abc.ABCMeta):
         file.write(struct.pack('<H', data))
 
     def write_sectors(self, m: Map, file: BinaryIO, encrypt_key: int | None = None):
+        if m.columnar:
+            self.write_section_array(file, m, 'sector', m.sectors, self.map_cls.get_sector_dtype(), encrypt_key)
+            return
+        if self.bulk:
+            self.write_section_records(file, m.sectors, self.map_cls.sector_fmt, self.map_cls.sector_cls, encrypt_key)
+            return
         for sector in m.sectors:
             data = asdict(sector).values()
             packed = struct.pack(self.map_cls.sector_fmt, *data)
@@ -284,9 +1050,14 @@ class MapWriterBase(metaclass=abc.ABCMeta):
         file.write(struct.pack('<H', data))
 
     def write_walls(self, m: Map, file: BinaryIO, encrypt_key: int | None = None):
+        if m.columnar:
+            self.write_section_array(file, m, 'wall', m.walls, self.map_cls.get_wall_dtype(), encrypt_key)
+            return
+        if self.bulk:
+            self.write_section_records(file, m.walls, self.map_cls.wall_fmt, self.map_cls.wall_cls, encrypt_key)
+            return
         for wall in m.walls:
             data = asdict(wall).values()
-            print('data:', data)
             packed = struct.pack(self.map_cls.wall_fmt, *data)
             file.write(self.encrypt(packed, encrypt_key))
             if wall.extra > 0:
@@ -297,11 +1068,15 @@ class MapWriterBase(metaclass=abc.ABCMeta):
         file.write(struct.pack('<H', data))
 
     def write_sprites(self, m: Map, file: BinaryIO, encrypt_key: int | None = None):
+        if m.columnar:
+            self.write_section_array(file, m, 'sprite', m.sprites, self.map_cls.get_sprite_dtype(), encrypt_key)
+            return
+        if self.bulk:
+            self.write_section_records(file, m.sprites, self.map_cls.sprite_fmt, self.map_cls.sprite_cls, encrypt_key)
+            return
         for sprite in m.sprites:
             data = asdict(sprite).values()
             packed = struct.pack(self.map_cls.sprite_fmt, *data)
             file.write(self.encrypt(packed, encrypt_key))
-
-            # TODO: Conversion breaks here.
             if sprite.extra > 0 and sprite.extra_data is not None:
                 file.write(sprite.extra_data)
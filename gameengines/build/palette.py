@@ -1,20 +1,85 @@
+import os
+
 import numpy as np
 
 
 class Palette:
 
+    """
+    https://fabiensanglard.net/duke3d/BUILDINF.TXT
+
+    PALETTE.DAT holds the 256 colour palette, followed by the shade lookup
+    tables and the translucency table. Files with just the palette are also
+    accepted, in which case there is a single shade and no translucency.
+
+    """
+
     def __init__(self):
         self.data = None
+        self.shades = None
+        self.translucency = None
+        self.table = None
+
+    @property
+    def numshades(self) -> int:
+        return len(self.shades)
 
-    def load(self, file_path: str):
+    def load(self, source: str | os.PathLike | bytes | memoryview):
 
-        with open(file_path, 'rb') as f:
-            data = f.read(768)  # first 768 bytes = 256 colors × 3 components
+        # Accept a path or any buffer, such as a GRP member view.
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                data = f.read()
+        else:
+            data = source
+        view = memoryview(data).cast('B')
 
-        # Interpret as 256 × 3 uint8 array
-        palette = np.frombuffer(data, dtype=np.uint8).reshape((256, 3))
+        # Interpret the first 768 bytes as a 256 × 3 uint8 array
+        palette = np.frombuffer(view, dtype=np.uint8, count=768).reshape((256, 3))
 
         # Build palettes are 6-bit values (0–63), scale to 0–255
-        palette = (palette * 4).clip(0, 255).astype(np.uint8)
+        palette = (palette.astype(np.uint16) * 4).clip(0, 255).astype(np.uint8)
 
         self.data = palette
+
+        # Shade tables remap each index to a darker one, from full bright at
+        # shade 0 down to black.
+        offset = 768
+        self.shades = np.arange(256, dtype=np.uint8)[np.newaxis]
+        if len(view) >= offset + 2:
+            numshades = int(np.frombuffer(view, dtype='<i2', count=1, offset=offset)[0])
+            offset += 2
+            if numshades > 0 and len(view) >= offset + numshades * 256:
+                self.shades = np.frombuffer(view, dtype=np.uint8, count=numshades * 256, offset=offset).reshape((numshades, 256)).copy()
+                offset += numshades * 256
+
+        # Translucency maps a pair of indices to the index of their blend.
+        self.translucency = None
+        if len(view) >= offset + 256 * 256:
+            self.translucency = np.frombuffer(view, dtype=np.uint8, count=256 * 256, offset=offset).reshape((256, 256)).copy()
+
+        # Every shade resolved straight to RGB, so applying a shade is a
+        # single lookup.
+        self.table = self.data[self.shades]
+
+    def apply(self, indices: np.ndarray, shade: int | np.ndarray = 0, pal: np.ndarray | None = None) -> np.ndarray:
+        """
+        Convert palette indices to RGB in one lookup. shade may be a single
+        value or an array that broadcasts against indices. pal is an optional
+        256 entry remap applied to the indices first, as with Build's
+        palookups.
+
+        """
+        if pal is not None:
+            indices = np.asarray(pal, dtype=np.uint8)[indices]
+        shade = np.clip(shade, 0, self.numshades - 1)
+        return self.table[shade, indices]
+
+    def blend(self, source: np.ndarray, destination: np.ndarray) -> np.ndarray:
+        """
+        Blend two arrays of palette indices through the translucency table.
+
+        """
+        if self.translucency is None:
+            raise ValueError('Palette has no translucency table')
+        return self.translucency[source, destination]
@@ -0,0 +1,71 @@
+import numpy as np
+
+from gameengines.build.map import Map
+from gameengines.build.spatial import get_cell_keys, get_wall_sectors
+
+
+def get_point_ids(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return np.unique(get_cell_keys(x, y), return_inverse=True)[1].reshape(-1)
+
+
+def find_portals(m: Map) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the nextwall and nextsector each wall should have. Two walls form
+    a portal when they run between the same two points in opposite directions
+    and belong to different sectors.
+
+    """
+    m = m.to_columnar()
+    num_walls = len(m.walls)
+    x = m.walls['x']
+    y = m.walls['y']
+    point2 = m.walls['point2'].astype(np.int64)
+    wall_sectors = get_wall_sectors(
+        m.sectors['wallptr'].astype(np.int64),
+        m.sectors['wallnum'].astype(np.int64),
+        num_walls,
+    )
+    nextwall = np.full(num_walls, -1, dtype=np.int64)
+    nextsector = np.full(num_walls, -1, dtype=np.int64)
+    valid = (point2 >= 0) & (point2 < num_walls) & (wall_sectors >= 0)
+    walls = np.flatnonzero(valid)
+    if not len(walls):
+        return nextwall, nextsector
+
+    # Hash each endpoint to a small integer id, then each wall to the pair of
+    # ids it runs between. A wall's partner has the same pair reversed.
+    ends = point2[walls]
+    ids = get_point_ids(np.concatenate((x[walls], x[ends])), np.concatenate((y[walls], y[ends])))
+    start, end = ids[:len(walls)], ids[len(walls):]
+    num_points = int(ids.max()) + 1
+    forward = start * num_points + end
+    reverse = end * num_points + start
+    order = np.argsort(forward, kind='stable')
+    positions = np.searchsorted(forward[order], reverse)
+    positions = np.minimum(positions, len(walls) - 1)
+    matches = order[positions]
+    found = forward[matches] == reverse
+
+    # Walls in the same sector don't make a portal.
+    partners = walls[matches]
+    found &= wall_sectors[partners] != wall_sectors[walls]
+    nextwall[walls[found]] = partners[found]
+    nextsector[walls[found]] = wall_sectors[partners[found]]
+    return nextwall, nextsector
+
+
+def link_portals(m: Map) -> int:
+    """
+    Set nextwall and nextsector on every wall of the map in place, replacing
+    any existing links. Returns the number of walls linked.
+
+    """
+    nextwall, nextsector = find_portals(m)
+    if m.columnar:
+        m.walls['nextwall'] = nextwall
+        m.walls['nextsector'] = nextsector
+    else:
+        for wall, wall_nextwall, wall_nextsector in zip(m.walls, nextwall.tolist(), nextsector.tolist()):
+            wall.nextwall = wall_nextwall
+            wall.nextsector = wall_nextsector
+    return int((nextwall >= 0).sum())
@@ -0,0 +1,83 @@
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PhaseStats:
+
+    """
+    Timing for one phase of reading or writing a map. Bytes and records are
+    None where they don't apply or can't be measured, eg the bytes moved
+    through a stream that can't tell its position.
+
+    """
+
+    operation: str
+    phase: str
+    seconds: float
+    bytes: int | None = None
+    records: int | None = None
+
+
+def log_phase(stats: PhaseStats):
+    """
+    Observer that logs each phase at debug level.
+
+    """
+    logger.debug(
+        f'{stats.operation} {stats.phase}: {stats.seconds * 1000:.3f}ms, '
+        f'{stats.bytes} bytes, {stats.records} records'
+    )
+
+
+def get_position(file) -> int | None:
+    # Behind a lazy section the position isn't known until its records are
+    # walked, which telling would force.
+    if getattr(file, 'pending', None) is not None:
+        return None
+    try:
+        return file.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class Profiled:
+
+    """
+    Reports each phase run through run_phase to an optional observer. With
+    no observer the phase is called straight through, so leaving profiling
+    off costs one attribute check per phase.
+
+    """
+
+    operation = None
+
+    def __init__(self, observer: Callable[[PhaseStats], None] | None = None):
+        self.observer = observer
+
+    def run_phase(self, phase: str, func: Callable, *args, file=None, nbytes: int | None = None, records: int | None = None):
+        """
+        Call func, reporting how long it took. Bytes are given as nbytes or
+        measured from how far the call moves the file's position. Records
+        default to the length of the result, if it has one.
+
+        """
+        if self.observer is None:
+            return func(*args)
+        start_position = get_position(file) if file is not None else None
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        if nbytes is None and start_position is not None:
+            end_position = get_position(file)
+            if end_position is not None:
+                nbytes = end_position - start_position
+        if records is None and hasattr(result, '__len__'):
+            records = len(result)
+        self.observer(PhaseStats(self.operation, phase, seconds, nbytes, records))
+        return result
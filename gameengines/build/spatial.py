@@ -0,0 +1,178 @@
+import numpy as np
+
+from gameengines.build.map import Map
+
+
+# Points are tested in batches of this size to bound memory use.
+BATCH_SIZE = 65536
+
+
+def get_cell_keys(cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+    return (cx.astype(np.int64) << 32) | (cy.astype(np.int64) & 0xFFFFFFFF)
+
+
+def get_wall_sectors(wallptr: np.ndarray, wallnum: np.ndarray, num_walls: int) -> np.ndarray:
+    """
+    Return the sector each wall belongs to, or -1 for walls no sector claims.
+
+    """
+    wall_sectors = np.full(num_walls, -1, dtype=np.int64)
+    sectors = np.repeat(np.arange(len(wallptr)), wallnum)
+    walls = np.repeat(wallptr, wallnum) + get_ranks(wallnum)
+    valid = (walls >= 0) & (walls < num_walls)
+    wall_sectors[walls[valid]] = sectors[valid]
+    return wall_sectors
+
+
+def get_ranks(counts: np.ndarray) -> np.ndarray:
+    """
+    For groups of the given sizes laid end to end, return each element's
+    position within its group.
+
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(starts, counts)
+
+
+class SectorIndex:
+
+    """
+    Uniform grid over sector bounding boxes, used to find which sector
+    contains a point, as the engine's updatesector does. Candidate sectors
+    come from the point's grid cell and are then tested exactly with the
+    engine's inside() crossing rule over all of their walls.
+
+    """
+
+    def __init__(self, m: Map, cell_size: int | None = None):
+        m = m.to_columnar()
+        self.wallptr = m.sectors['wallptr'].astype(np.int64)
+        self.wallnum = m.sectors['wallnum'].astype(np.int64)
+        self.x = m.walls['x'].astype(np.int64)
+        self.y = m.walls['y'].astype(np.int64)
+        self.point2 = m.walls['point2'].astype(np.int64)
+        self.wall_sectors = get_wall_sectors(self.wallptr, self.wallnum, len(self.x))
+        self.bounds = np.zeros((len(self.wallptr), 4), dtype=np.int64)
+        self.update_bounds(np.arange(len(self.wallptr)))
+        self.cell_size = cell_size or self.get_default_cell_size()
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_sectors = np.empty(0, dtype=np.int64)
+        self.insert(np.arange(len(self.wallptr)))
+
+    def get_default_cell_size(self) -> int:
+
+        # Aim for roughly one sector per cell.
+        valid = self.wallnum > 0
+        if not valid.any():
+            return 1024
+        widths = self.bounds[valid, 2] - self.bounds[valid, 0]
+        heights = self.bounds[valid, 3] - self.bounds[valid, 1]
+        return max(1, int(np.sqrt(np.mean(widths * heights.astype(np.float64)))))
+
+    def update_bounds(self, sectors: np.ndarray):
+        sectors = sectors[self.wallnum[sectors] > 0]
+        if not len(sectors):
+            return
+        walls = np.repeat(self.wallptr[sectors], self.wallnum[sectors]) + get_ranks(self.wallnum[sectors])
+        starts = np.cumsum(self.wallnum[sectors]) - self.wallnum[sectors]
+        x, y = self.x[walls], self.y[walls]
+        self.bounds[sectors, 0] = np.minimum.reduceat(x, starts)
+        self.bounds[sectors, 1] = np.minimum.reduceat(y, starts)
+        self.bounds[sectors, 2] = np.maximum.reduceat(x, starts)
+        self.bounds[sectors, 3] = np.maximum.reduceat(y, starts)
+
+    def insert(self, sectors: np.ndarray):
+        """
+        Bin sectors into every grid cell their bounding box touches.
+
+        """
+        sectors = sectors[self.wallnum[sectors] > 0]
+        cells = self.bounds[sectors] // self.cell_size
+        widths = cells[:, 2] - cells[:, 0] + 1
+        heights = cells[:, 3] - cells[:, 1] + 1
+        counts = widths * heights
+        ranks = get_ranks(counts)
+        cx = np.repeat(cells[:, 0], counts) + ranks // np.repeat(heights, counts)
+        cy = np.repeat(cells[:, 1], counts) + ranks % np.repeat(heights, counts)
+        keys = np.concatenate((self.cell_keys, get_cell_keys(cx, cy)))
+        values = np.concatenate((self.cell_sectors, np.repeat(sectors, counts)))
+        order = np.argsort(keys, kind='stable')
+        self.cell_keys = keys[order]
+        self.cell_sectors = values[order]
+
+    def update(self, m: Map, walls: np.ndarray | list[int] | None = None):
+        """
+        Pick up moved walls from the map. Only the sectors those walls belong
+        to are rebinned. Wall and sector counts must not have changed.
+
+        """
+        m = m.to_columnar()
+        walls = np.arange(len(self.x)) if walls is None else np.asarray(walls, dtype=np.int64)
+        self.x[walls] = m.walls['x'][walls]
+        self.y[walls] = m.walls['y'][walls]
+        sectors = np.unique(self.wall_sectors[walls])
+        sectors = sectors[sectors >= 0]
+        keep = ~np.isin(self.cell_sectors, sectors)
+        self.cell_keys = self.cell_keys[keep]
+        self.cell_sectors = self.cell_sectors[keep]
+        self.update_bounds(sectors)
+        self.insert(sectors)
+
+    def find(self, x: int, y: int) -> int:
+        return int(self.find_many(np.array([x]), np.array([y]))[0])
+
+    def find_many(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Return the sector containing each point, or -1 if none does. Where
+        sectors overlap the lowest numbered one wins.
+
+        """
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+        result = np.full(len(x), -1, dtype=np.int64)
+        for start in range(0, len(x), BATCH_SIZE):
+            end = start + BATCH_SIZE
+            result[start:end] = self.find_batch(x[start:end], y[start:end])
+        return result
+
+    def find_batch(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        result = np.full(len(x), -1, dtype=np.int64)
+
+        # Expand each point into one candidate pair per sector in its cell.
+        keys = get_cell_keys(x // self.cell_size, y // self.cell_size)
+        lo = np.searchsorted(self.cell_keys, keys, side='left')
+        hi = np.searchsorted(self.cell_keys, keys, side='right')
+        counts = hi - lo
+        points = np.repeat(np.arange(len(x)), counts)
+        sectors = self.cell_sectors[np.repeat(lo, counts) + get_ranks(counts)]
+
+        # Cheap bounding box rejection before the exact test.
+        px, py = x[points], y[points]
+        bounds = self.bounds[sectors]
+        hit = (px >= bounds[:, 0]) & (px <= bounds[:, 2]) & (py >= bounds[:, 1]) & (py <= bounds[:, 3])
+        points, sectors, px, py = points[hit], sectors[hit], px[hit], py[hit]
+        if not len(points):
+            return result
+
+        # Expand each pair into its sector's walls and count crossings.
+        wallnum = self.wallnum[sectors]
+        walls = np.repeat(self.wallptr[sectors], wallnum) + get_ranks(wallnum)
+        wx, wy = np.repeat(px, wallnum), np.repeat(py, wallnum)
+        x1, y1 = self.x[walls] - wx, self.y[walls] - wy
+        x2, y2 = self.x[self.point2[walls]] - wx, self.y[self.point2[walls]] - wy
+        straddles = (y1 < 0) != (y2 < 0)
+        same_side = (x1 < 0) == (x2 < 0)
+        crosses = np.where(same_side, x1 < 0, ((x1 * y2 - x2 * y1) < 0) != (y2 < 0))
+        toggles = (straddles & crosses).astype(np.int64)
+        starts = np.cumsum(wallnum) - wallnum
+        inside = (np.add.reduceat(toggles, starts) & 1).astype(bool)
+
+        # Keep the lowest numbered containing sector for each point.
+        points, sectors = points[inside], sectors[inside]
+        order = np.lexsort((sectors, points))
+        points, sectors = points[order], sectors[order]
+        first = np.ones(len(points), dtype=bool)
+        first[1:] = points[1:] != points[:-1]
+        result[points[first]] = sectors[first]
+        return result
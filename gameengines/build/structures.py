@@ -27,6 +27,12 @@ class StructureBase(ctypes.LittleEndianStructure, metaclass=Metacls):
             raise EOFError('Not enough bytes to fill structure')
         return cls.from_buffer_copy(buf)
 
+    @classmethod
+    def from_view(cls, view, offset: int = 0):
+        if len(view) - offset < ctypes.sizeof(cls):
+            raise EOFError('Not enough bytes to fill structure')
+        return cls.from_buffer_copy(view, offset)
+
 
 class ArtHeader(StructureBase):
 
@@ -0,0 +1,60 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gameengines.build.art import ArtFile, TileAtlas, load_atlas, read_art_tables
+from gameengines.build.tests.test_grp import make_art
+
+
+class TestArt(unittest.TestCase):
+
+    def setUp(self):
+        self.tiles = [
+            np.arange(6, dtype=np.uint8).reshape((2, 3)),
+            np.zeros((0, 0), dtype=np.uint8),
+            np.arange(20, dtype=np.uint8).reshape((5, 4)),
+        ]
+        self.data = make_art(self.tiles, localtilestart=256)
+
+    def test_read_art_tables(self):
+        tables = read_art_tables(self.data)
+        self.assertEqual(256, tables.header.localtilestart)
+        self.assertEqual(3, tables.numtiles)
+        self.assertEqual([2, 0, 5], tables.tilesizx.tolist())
+        self.assertEqual([3, 0, 4], tables.tilesizy.tolist())
+
+    def test_load_atlas(self):
+        atlas = load_atlas(self.data)
+        self.assertEqual(3, len(atlas))
+        self.assertEqual(26, len(atlas.pixels))
+        self.assertEqual([0, 6, 6], atlas.offsets.tolist())
+        for expected, index in zip(self.tiles, range(len(atlas))):
+            np.testing.assert_array_equal(expected, atlas[index])
+            self.assertFalse(atlas[index].flags.owndata)
+
+    def test_concatenate(self):
+        atlas = TileAtlas.concatenate([load_atlas(self.data), load_atlas(self.data)])
+        self.assertEqual(6, len(atlas))
+        self.assertEqual([0, 6, 6, 26, 32, 32], atlas.offsets.tolist())
+        np.testing.assert_array_equal(self.tiles[2], atlas[5])
+
+    def test_truncated(self):
+        with self.assertRaises(EOFError):
+            load_atlas(self.data[:-1])
+
+    def test_art_file(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            file_path = Path(dir_path).joinpath('TILES001.ART')
+            file_path.write_bytes(self.data)
+            for source in (file_path, self.data):
+                with ArtFile(source) as art:
+                    self.assertEqual(3, len(art))
+                    self.assertIn(258, art)
+                    self.assertNotIn(2, art)
+                    np.testing.assert_array_equal(self.tiles[2], art[258])
+                    np.testing.assert_array_equal(self.tiles[0], art[256])
+                    self.assertEqual((0, 0), art[257].shape)
+                    with self.assertRaises(IndexError):
+                        art[259]
@@ -0,0 +1,111 @@
+import io
+import unittest
+
+import numpy as np
+
+from gameengines.build.blood import Map as BloodMap, MapReader as BloodMapReader, MapWriter as BloodMapWriter
+from gameengines.build.builder import MapBuilder
+from gameengines.build.duke3d import MapReader as Duke3dMapReader, MapWriter as Duke3dMapWriter
+from gameengines.build.spatial import SectorIndex
+from gameengines.build.tests.test_graph import link_row
+from gameengines.build.tests.test_spatial import make_grid_map
+from gameengines.build.validate import validate
+
+
+class TestMapBuilder(unittest.TestCase):
+
+    def test_grid_matches_hand_built(self):
+        builder = MapBuilder()
+        self.assertEqual([0, 1, 2], builder.add_grid(3, 1, 1024).tolist())
+        m = builder.build()
+        self.assertTrue(m.columnar)
+        expected = make_grid_map(3, 1)
+        link_row(expected, 3)
+        self.assertEqual(expected.sectors, m.to_records().sectors)
+        self.assertEqual(expected.walls, m.to_records().walls)
+
+    def test_mask_and_fields(self):
+        mask = np.array([[True, False, True], [True, True, True]])
+        builder = MapBuilder()
+        sectors = builder.add_grid(3, 2, 512, mask=mask, sector={'floorz': 8192, 'ceilingz': np.arange(5)}, wall={'xrepeat': 32})
+        m = builder.build()
+        self.assertEqual(5, len(sectors))
+        self.assertEqual([8192] * 5, m.sectors['floorz'].tolist())
+        self.assertEqual(list(range(5)), m.sectors['ceilingz'].tolist())
+        self.assertTrue((m.walls['xrepeat'] == 32).all())
+        self.assertTrue((m.walls['extra'] == -1).all())
+        self.assertTrue(validate(m).is_valid)
+
+        # The gap at the top middle leaves its neighbours unlinked there.
+        self.assertEqual(-1, m.walls['nextsector'][1])
+        self.assertEqual(2, m.walls['nextsector'][2])
+
+    def test_polygon_with_hole(self):
+        builder = MapBuilder()
+        x = [0, 4096, 4096, 0, 1024, 1024, 3072, 3072]
+        y = [0, 0, 4096, 4096, 1024, 3072, 3072, 1024]
+        builder.add_polygons(x, y, [4, 4], loops_per_sector=[2])
+        builder.add_polygons([1024, 3072, 3072, 1024], [1024, 1024, 3072, 3072], [4])
+        m = builder.build()
+        self.assertEqual([(0, 8), (8, 4)], m.sectors[['wallptr', 'wallnum']].tolist())
+        self.assertEqual([1, 2, 3, 0, 5, 6, 7, 4], m.walls['point2'][:8].tolist())
+        self.assertEqual([11, 10, 9, 8], m.walls['nextwall'][4:8].tolist())
+        self.assertTrue(validate(m).is_valid)
+        index = SectorIndex(m)
+        self.assertEqual(0, index.find(500, 500))
+        self.assertEqual(1, index.find(2000, 2000))
+
+    def test_sprites(self):
+        builder = MapBuilder()
+        builder.add_grid(2, 2, 1024)
+        builder.add_sprites([100, 1500, 5000], [100, 1500, 100], sprite={'picnum': 7})
+        builder.add_sprites([10], [10], sectnum=[3])
+        m = builder.build()
+        self.assertEqual([0, 3, -1, 3], m.sprites['sectnum'].tolist())
+        self.assertEqual([7, 7, 7, 0], m.sprites['picnum'].tolist())
+
+    def test_bad_loops(self):
+        builder = MapBuilder()
+        with self.assertRaises(ValueError):
+            builder.add_polygons([0, 1, 2], [0, 1, 2], [4])
+        with self.assertRaises(ValueError):
+            builder.add_polygons([0, 1], [0, 1], [2])
+        with self.assertRaises(ValueError):
+            builder.add_polygons([0, 1, 2], [0, 1, 2], [3], loops_per_sector=[2])
+
+    def test_duke3d_round_trip(self):
+        builder = MapBuilder()
+        builder.add_grid(4, 4, 1024, sector={'ceilingz': -16384})
+        builder.add_sprites([512], [512])
+        m = builder.build()
+        output = io.BytesIO()
+        Duke3dMapWriter()(m, output)
+        result = Duke3dMapReader(columnar=True)(io.BytesIO(output.getvalue()))
+        np.testing.assert_array_equal(m.sectors, result.sectors)
+        np.testing.assert_array_equal(m.walls, result.walls)
+        np.testing.assert_array_equal(m.sprites, result.sprites)
+
+    def test_blood_round_trip(self):
+        builder = MapBuilder(BloodMap)
+        builder.add_grid(3, 3, 1024)
+        m = builder.build()
+        self.assertIsInstance(m, BloodMap)
+        output = io.BytesIO()
+        BloodMapWriter()(m, output)
+        result = BloodMapReader(columnar=True)(io.BytesIO(output.getvalue()))
+        np.testing.assert_array_equal(m.walls, result.walls)
+
+    def test_large_grid(self):
+
+        # wallptr is 16 bit, which caps a grid of squares at 8192 sectors.
+        builder = MapBuilder()
+        builder.add_grid(128, 64, 512)
+        m = builder.build()
+        self.assertEqual(8192, len(m.sectors))
+        self.assertTrue(validate(m).is_valid)
+
+    def test_too_many_walls(self):
+        builder = MapBuilder()
+        builder.add_grid(129, 64, 512)
+        with self.assertRaises(ValueError):
+            builder.build()
@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gameengines.build.cache import TileCache
+from gameengines.build.grp import Grp
+from gameengines.build.palette import Palette
+from gameengines.build.tests.test_grp import make_art, make_grp
+
+
+class TestTileCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tiles = [np.full((4, 4), i, dtype=np.uint8) for i in range(3)]
+        self.tiles[2][0, 0] = 255
+        self.dir = tempfile.TemporaryDirectory()
+        file_path = Path(self.dir.name).joinpath('test.grp')
+        file_path.write_bytes(make_grp([
+            ('TILES000.ART', make_art(self.tiles[:2])),
+            ('TILES001.ART', make_art(self.tiles[2:], localtilestart=2)),
+        ]))
+        self.grp = Grp()
+        self.grp.index(file_path)
+        self.palette = Palette()
+        self.palette.load(np.repeat(np.arange(256, dtype=np.uint8) // 4, 3).tobytes())
+
+    def tearDown(self):
+        self.grp.close()
+        self.dir.cleanup()
+
+    def test_get_indices(self):
+        cache = TileCache()
+        first = cache.get_indices(self.grp, 2)
+        np.testing.assert_array_equal(self.tiles[2], first)
+        self.assertIs(first, cache.get_indices(self.grp, 2))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        with self.assertRaises(IndexError):
+            cache.get_indices(self.grp, 3)
+
+    def test_get_colors(self):
+        cache = TileCache()
+        colors = cache.get_colors(self.grp, 1, self.palette)
+        self.assertEqual((4, 4, 3), colors.shape)
+        np.testing.assert_array_equal(self.palette.data[1], colors[0, 0])
+        rgba = cache.get_colors(self.grp, 2, self.palette, alpha=True)
+        self.assertEqual(0, rgba[0, 0, 3])
+        self.assertEqual(255, rgba[0, 1, 3])
+        self.assertFalse(rgba.flags.writeable)
+
+    def test_eviction(self):
+        cache = TileCache(max_bytes=32)
+        for tilenum in range(3):
+            cache.get_indices(self.grp, tilenum)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(32, cache.num_bytes)
+        self.assertNotIn((cache.get_archive_key(self.grp), 0), cache)
+        cache.get_indices(self.grp, 1)
+        cache.get_indices(self.grp, 0)
+        self.assertNotIn((cache.get_archive_key(self.grp), 2), cache)
@@ -0,0 +1,78 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gameengines import convert
+from gameengines.build.blood import MapReader as BloodMapReader
+from gameengines.build.builder import MapBuilder
+from gameengines.build.duke3d import Map as Duke3dMap, MapReader as Duke3dMapReader
+from gameengines.build.tests.test_grp import make_grp
+from gameengines.wolf3d.map import HavocMapReader
+
+
+DATA_DIR = Path(__file__).parent.joinpath('data')
+
+
+class TestConvert(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.dir.name).joinpath('out')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_main(self, *args) -> tuple[int, str, str]:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            code = convert.main([*map(str, args), '-o', str(self.output_dir), '-j', '2'])
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_directory_to_blood(self):
+        code, stdout, stderr = self.run_main(DATA_DIR, 'blood')
+        self.assertEqual(0, code, stderr)
+        self.assertIn('Converted 2/2 maps', stdout)
+        self.assertIn('maps/s', stdout)
+        self.assertIn('MB/s', stdout)
+        for name in ('blood.map', 'duke3d.map'):
+            m = BloodMapReader().open(self.output_dir.joinpath(name))
+            self.assertEqual(4, len(m.walls))
+
+    def test_grp_to_duke3d(self):
+        grp_path = Path(self.dir.name).joinpath('test.grp')
+        grp_path.write_bytes(make_grp([
+            ('BLOOD.MAP', DATA_DIR.joinpath('blood.map').read_bytes()),
+            ('GAME.CON', b'define foo 1\n'),
+            ('BROKEN.MAP', b'\x07\x00'),
+        ]))
+        code, stdout, stderr = self.run_main(grp_path, 'duke3d')
+        self.assertEqual(1, code)
+        self.assertIn('Converted 1/2 maps', stdout)
+        self.assertIn('1 failed', stdout)
+        self.assertIn('BROKEN.MAP', stderr)
+        m = Duke3dMapReader().open(self.output_dir.joinpath('BLOOD.MAP'))
+        self.assertEqual([-1], [sprite.extra for sprite in m.sprites])
+
+    def test_rasterize(self):
+        builder = MapBuilder()
+        builder.add_grid(2, 1, 1024)
+        m = builder.build(Duke3dMap.header_cls(posx=1536, posy=512, ang=1536))
+        wolf3d_map = convert.rasterize(m, 8, 8)
+        plane = wolf3d_map.tiles[:, :, 0]
+
+        # Two sectors side by side fill the top half of the grid.
+        self.assertTrue((plane[:, :4] == convert.AREA_TILE).all())
+        self.assertTrue((plane[:, 4:] == convert.WALL_TILE).all())
+        self.assertEqual(19, wolf3d_map.tiles[6, 2, 1])
+        self.assertEqual(1, np.count_nonzero(wolf3d_map.tiles[:, :, 1]))
+
+    def test_to_havoc(self):
+        code, _, stderr = self.run_main(DATA_DIR.joinpath('duke3d.map'), 'havoc')
+        self.assertEqual(0, code, stderr)
+        wolf3d_map = HavocMapReader()(self.output_dir.joinpath('duke3d.map'))
+        self.assertEqual((64, 64, 3), wolf3d_map.tiles.shape)
+        self.assertTrue((wolf3d_map.tiles[:, :, 0] == convert.AREA_TILE).any())
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from gameengines.build.diskcache import AssetCache
+from gameengines.build.tests.test_grp import make_art, make_grp
+from gameengines.build.tests.test_palette import make_palette_dat
+
+
+class TestAssetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tiles = [np.full((3, 2), i, dtype=np.uint8) for i in range(4)]
+        self.dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.dir.name).joinpath('test.grp')
+        self.write_grp(self.tiles)
+        self.cache = AssetCache(Path(self.dir.name).joinpath('cache'))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_grp(self, tiles):
+        self.file_path.write_bytes(make_grp([
+            ('TILES000.ART', make_art(tiles)),
+            ('PALETTE.DAT', make_palette_dat()),
+        ]))
+
+    def test_load(self):
+        assets = self.cache.load(self.file_path)
+        self.assertEqual(4, len(assets.atlas))
+        self.assertIsInstance(assets.atlas.pixels, np.memmap)
+        np.testing.assert_array_equal(self.tiles[3], assets.atlas[3])
+        self.assertEqual(4, assets.palette.numshades)
+        self.assertEqual((256, 256), assets.palette.translucency.shape)
+
+    def test_warm_load_skips_decode(self):
+        self.cache.load(self.file_path)
+        with mock.patch('gameengines.build.diskcache.Grp') as grp_cls:
+            assets = self.cache.load(self.file_path)
+        grp_cls.assert_not_called()
+        np.testing.assert_array_equal(self.tiles[1], assets.atlas[1])
+
+    def test_touched_archive_is_not_rebuilt(self):
+        self.cache.load(self.file_path)
+        stat = os.stat(self.file_path)
+        os.utime(self.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with mock.patch('gameengines.build.diskcache.Grp') as grp_cls:
+            self.cache.load(self.file_path)
+        grp_cls.assert_not_called()
+
+    def test_changed_archive_is_rebuilt(self):
+        self.cache.load(self.file_path)
+        tiles = [tile + 10 for tile in self.tiles]
+        self.write_grp(tiles)
+        stat = os.stat(self.file_path)
+        os.utime(self.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assets = self.cache.load(self.file_path)
+        np.testing.assert_array_equal(tiles[2], assets.atlas[2])
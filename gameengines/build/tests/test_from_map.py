@@ -0,0 +1,77 @@
+import io
+import struct
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gameengines.build.blood import Map as BloodMap, MapReader as BloodMapReader, MapWriter as BloodMapWriter
+from gameengines.build.builder import MapBuilder
+from gameengines.build.duke3d import Map as Duke3dMap, MapReader as Duke3dMapReader, MapWriter as Duke3dMapWriter
+
+
+class TestFromMap(unittest.TestCase):
+
+    def setUp(self):
+        builder = MapBuilder()
+        builder.add_grid(3, 2, 1024, sector={'floorz': 8192, 'extra': [-1, 0, 3, -1, -1, -1]})
+        builder.add_sprites([100, 1500, 2500], [100, 100, 1500], sprite={'picnum': 1405, 'extra': [-1, 5, 0]})
+        self.duke3d = builder.build(Duke3dMap.header_cls(posx=100, posy=100, ang=512, cursectnum=0))
+
+    def test_duke3d_to_blood(self):
+        m = BloodMap.from_map(self.duke3d)
+        self.assertIsInstance(m, BloodMap)
+        self.assertTrue(m.columnar)
+        self.assertEqual((b'BLM\x1a', 7, 100, 100, 512, 0), (
+            m.header.signature, m.header.version, m.header.posx, m.header.posy, m.header.ang, m.header.cursectnum,
+        ))
+        self.assertEqual((6, 24, 3), (m.header.numsectors, m.header.numwalls, m.header.numsprites))
+        np.testing.assert_array_equal(self.duke3d.walls, m.walls)
+
+        # Only records with extra set get extended data, referencing them.
+        self.assertEqual([2], list(m.extra_data['sectors']))
+        self.assertEqual({}, m.extra_data['walls'])
+        self.assertEqual([1], list(m.extra_data['sprites']))
+        data = m.extra_data['sprites'][1]
+        self.assertEqual(56, len(data))
+        self.assertEqual(1, struct.unpack_from('<I', data)[0] & 0x3FFF)
+        self.assertEqual(bytes(52), data[4:])
+
+        output = io.BytesIO()
+        BloodMapWriter()(m, output)
+        result = BloodMapReader(columnar=True)(io.BytesIO(output.getvalue()))
+        np.testing.assert_array_equal(m.sectors, result.sectors)
+        np.testing.assert_array_equal(m.walls, result.walls)
+        np.testing.assert_array_equal(m.sprites, result.sprites)
+        self.assertEqual(m.extra_data, result.extra_data)
+
+    def test_blood_to_duke3d(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        blood = BloodMapReader().open(file_path)
+        m = Duke3dMap.from_map(blood)
+        self.assertEqual(7, m.header.version)
+        self.assertEqual((-4082, 1005), (m.header.posx, m.header.posy))
+        self.assertEqual([-1], m.sprites['extra'].tolist())
+        self.assertEqual({'sectors': {}, 'walls': {}, 'sprites': {}}, m.extra_data)
+        self.assertEqual([s.picnum for s in blood.sprites], m.sprites['picnum'].tolist())
+
+        output = io.BytesIO()
+        Duke3dMapWriter()(m, output)
+        result = Duke3dMapReader()(io.BytesIO(output.getvalue()))
+        self.assertEqual(m.to_records().walls, result.walls)
+        self.assertEqual(m.to_records().sprites, result.sprites)
+
+    def test_round_trip(self):
+        m = Duke3dMap.from_map(BloodMap.from_map(self.duke3d))
+        np.testing.assert_array_equal(self.duke3d.walls, m.walls)
+        np.testing.assert_array_equal(self.duke3d.sprites[['x', 'y', 'picnum']], m.sprites[['x', 'y', 'picnum']])
+        self.assertTrue((m.sectors['extra'] == -1).all())
+        self.assertTrue((m.sprites['extra'] == -1).all())
+
+    def test_same_format(self):
+
+        # Duke3D's extra is a plain gameplay field and is left alone.
+        m = Duke3dMap.from_map(self.duke3d.to_records())
+        np.testing.assert_array_equal(self.duke3d.sprites, m.sprites)
+        blood = BloodMap.from_map(self.duke3d)
+        self.assertEqual(blood.extra_data, BloodMap.from_map(blood).extra_data)
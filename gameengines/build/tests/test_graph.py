@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from gameengines.build.graph import SectorGraph
+from gameengines.build.tests.test_spatial import make_grid_map
+
+
+def link_row(m, columns: int):
+
+    # Link each square in a single row to the next, as 3_squares.py does.
+    for column in range(columns - 1):
+        right_wall = column * 4 + 1
+        left_wall = (column + 1) * 4 + 3
+        m.walls[right_wall].nextsector, m.walls[right_wall].nextwall = column + 1, left_wall
+        m.walls[left_wall].nextsector, m.walls[left_wall].nextwall = column, right_wall
+
+
+class TestSectorGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.m = make_grid_map(6, 1)
+        link_row(self.m, 4)
+        self.graph = SectorGraph.from_map(self.m)
+
+    def test_from_map(self):
+        self.assertEqual(6, len(self.graph))
+        self.assertEqual([0, 1, 3, 5, 6, 6, 6], self.graph.indptr.tolist())
+        self.assertEqual([0, 2], self.graph.neighbours(1).tolist())
+
+    def test_bfs(self):
+        distances, parents = self.graph.bfs(0)
+        self.assertEqual([0, 1, 2, 3, -1, -1], distances.tolist())
+        self.assertEqual([-1, 0, 1, 2, -1, -1], parents.tolist())
+
+    def test_shortest_path(self):
+        self.assertEqual([3, 2, 1, 0], self.graph.shortest_path(3, 0))
+        self.assertEqual([2], self.graph.shortest_path(2, 2))
+        self.assertIsNone(self.graph.shortest_path(0, 5))
+
+    def test_connected_components(self):
+        self.assertEqual([0, 0, 0, 0, 4, 5], self.graph.connected_components().tolist())
+
+    def test_reachable_from_start(self):
+        self.m.header.cursectnum = 2
+        self.assertEqual([True] * 4 + [False] * 2, self.graph.reachable_from_start(self.m).tolist())
+        self.m.header.cursectnum = -1
+        self.assertFalse(self.graph.reachable_from_start(self.m).any())
+
+    def test_long_chain(self):
+        num_sectors = 5000
+        sources = np.arange(num_sectors - 1)
+        graph = SectorGraph.from_edges(num_sectors, np.concatenate((sources, sources + 1)), np.concatenate((sources + 1, sources)))
+        self.assertTrue((graph.connected_components() == 0).all())
+        self.assertEqual(num_sectors - 1, graph.bfs(0)[0][-1])
@@ -0,0 +1,242 @@
+import concurrent.futures
+import io
+import os
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from gameengines.build.grp import Grp, GrpWriter
+
+
+def make_art(tiles: list[np.ndarray], localtilestart: int = 0) -> bytes:
+    localtileend = localtilestart + len(tiles) - 1
+    data = bytearray(struct.pack('<iiii', 1, len(tiles), localtilestart, localtileend))
+    data.extend(struct.pack(f'<{len(tiles)}h', *(tile.shape[0] for tile in tiles)))
+    data.extend(struct.pack(f'<{len(tiles)}h', *(tile.shape[1] for tile in tiles)))
+    data.extend(struct.pack(f'<{len(tiles)}i', *([0] * len(tiles))))
+    for tile in tiles:
+        data.extend(tile.astype(np.uint8).tobytes())
+    return bytes(data)
+
+
+def make_grp(members: list[tuple[str, bytes]]) -> bytes:
+    data = bytearray(b'KenSilverman')
+    data.extend(struct.pack('<I', len(members)))
+    for name, member in members:
+        data.extend(name.encode('ascii').ljust(12, b'\0'))
+        data.extend(struct.pack('<I', len(member)))
+    for _, member in members:
+        data.extend(member)
+    return bytes(data)
+
+
+class TestGrp(unittest.TestCase):
+
+    def setUp(self):
+        self.tiles = [
+            np.arange(6, dtype=np.uint8).reshape((2, 3)),
+            np.full((4, 1), 7, dtype=np.uint8),
+            np.arange(16, dtype=np.uint8).reshape((4, 4)),
+        ]
+        self.members = [
+            ('GAME.CON', b'define foo 1\n'),
+            ('TILES001.ART', make_art(self.tiles[::-1], localtilestart=3)),
+            ('E1L1.MAP', bytes(range(200))),
+            ('TILES000.ART', make_art(self.tiles)),
+        ]
+        self.dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.dir.name).joinpath('test.grp')
+        self.file_path.write_bytes(make_grp(self.members))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_index(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        self.assertEqual([name for name, _ in self.members], grp.names)
+        self.assertEqual(16 * 5, grp.entries['GAME.CON'].offset)
+        self.assertEqual(16 * 5 + 13, grp.entries['TILES001.ART'].offset)
+        self.assertIn('e1l1.map', grp)
+
+    def test_index_truncated(self):
+        grp = Grp()
+        for size in (16 + 16 * 2, 16 + 16 * 2 + 5):
+            self.file_path.write_bytes(make_grp(self.members)[:size])
+            with self.assertRaises(EOFError):
+                grp.index(self.file_path)
+
+    def test_read(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        for name, member in self.members:
+            self.assertEqual(member, grp.read(name))
+        with self.assertRaises(FileNotFoundError):
+            grp.read('MISSING.MAP')
+
+    def test_read_truncated(self):
+        self.file_path.write_bytes(self.file_path.read_bytes()[:-10])
+        grp = Grp()
+        grp.index(self.file_path)
+        with self.assertRaises(EOFError):
+            grp.read('TILES000.ART')
+        with grp.open('TILES000.ART') as f, self.assertRaises(EOFError):
+            f.read()
+        self.assertEqual(bytes(range(200)), grp.read('E1L1.MAP'))
+
+    def test_open(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        with grp.open('e1l1.map') as f:
+            self.assertEqual(bytes(range(10)), f.read(10))
+            f.seek(-5, 2)
+            self.assertEqual(bytes(range(195, 200)), f.read())
+            self.assertEqual(b'', f.read())
+
+    def test_get_art(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        textures = grp.get_art('TILES000.ART')
+        self.assertEqual(len(self.tiles), len(textures))
+        for expected, texture in zip(self.tiles, textures):
+            np.testing.assert_array_equal(expected, texture)
+
+    def test_load_atlas(self):
+        grp = Grp()
+        grp.load(self.file_path)
+        grp.load_atlas(self.file_path)
+        self.assertEqual(len(grp.textures), len(grp.atlas))
+        self.assertTrue(grp.atlas.pixels.flags.owndata)
+        for texture, index in zip(grp.textures, range(len(grp.atlas))):
+            np.testing.assert_array_equal(texture, grp.atlas[index])
+
+    def test_extract_all(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        dest_dir = Path(self.dir.name).joinpath('extracted')
+        file_paths = grp.extract_all(dest_dir, max_workers=2)
+        self.assertEqual(len(self.members), len(file_paths))
+        for name, member in self.members:
+            self.assertEqual(member, dest_dir.joinpath(name).read_bytes())
+
+    def test_extract_truncated(self):
+        self.file_path.write_bytes(self.file_path.read_bytes()[:-10])
+        grp = Grp()
+        grp.index(self.file_path)
+        dest_dir = Path(self.dir.name)
+        with self.assertRaises(EOFError):
+            grp.extract('TILES000.ART', dest_dir, chunk_size=7)
+        if hasattr(os, 'pread'):
+            fd = os.open(self.file_path, os.O_RDONLY)
+            try:
+                with self.assertRaises(EOFError):
+                    grp.extract('TILES000.ART', dest_dir, fd, chunk_size=7)
+            finally:
+                os.close(fd)
+
+    def test_extract_without_pread(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        dest_dir = Path(self.dir.name)
+        grp.extract('E1L1.MAP', dest_dir, chunk_size=7)
+        self.assertEqual(bytes(range(200)), dest_dir.joinpath('E1L1.MAP').read_bytes())
+
+    def test_view(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        view = grp.view('E1L1.MAP')
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(bytes(range(200)), view)
+        textures = grp.get_art('TILES000.ART')
+        self.assertFalse(textures[0].flags.owndata)
+
+    def test_close(self):
+        with Grp() as grp:
+            grp.index(self.file_path)
+            self.assertEqual(bytes(range(200)), bytes(grp.view('E1L1.MAP')))
+            tile = np.array(grp.get_tile(1))
+            textures = grp.get_art('TILES000.ART')
+            with self.assertRaises(BufferError):
+                grp.close()
+            del textures
+        self.assertIsNone(grp.mapping)
+        self.assertIsNone(grp.buffer)
+        self.assertIsNone(grp.art_files)
+        np.testing.assert_array_equal(self.tiles[1], tile)
+
+    def test_close_retry(self):
+        grp = Grp()
+        grp.index(self.file_path)
+        view = grp.view('E1L1.MAP')
+        with self.assertRaises(BufferError):
+            grp.close()
+        self.assertEqual(bytes(range(200)), bytes(grp.view('E1L1.MAP')))
+        del view
+        grp.close()
+        self.assertIsNone(grp.mapping)
+        self.assertIsNone(grp.buffer)
+
+    def test_load_in_context(self):
+        with Grp() as grp:
+            grp.load(self.file_path)
+        self.assertIsNone(grp.buffer)
+
+        # Textures follow the directory order, which lists TILES001.ART first.
+        expected = self.tiles[::-1] + self.tiles
+        self.assertEqual(len(expected), len(grp.textures))
+        for tile, texture in zip(expected, grp.textures):
+            np.testing.assert_array_equal(tile, texture)
+
+    def test_load_parallel(self):
+        expected = self.tiles + self.tiles[::-1]
+        for executor_cls in (concurrent.futures.ThreadPoolExecutor, concurrent.futures.ProcessPoolExecutor):
+            grp = Grp()
+            grp.load_parallel(self.file_path, max_workers=2, executor_cls=executor_cls)
+            self.assertEqual(len(expected), len(grp.textures))
+            for tile, texture in zip(expected, grp.textures):
+                np.testing.assert_array_equal(tile, texture)
+
+
+class Unseekable(io.RawIOBase):
+
+    def __init__(self, data: bytes):
+        super().__init__()
+        self.stream = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self.stream.readinto(buffer)
+
+
+class TestGrpWriter(unittest.TestCase):
+
+    def test_write(self):
+        members = [
+            ('GAME.CON', b'define foo 1\n'),
+            ('E1L1.MAP', bytes(range(200))),
+            ('TILES000.ART', make_art([np.zeros((2, 2), dtype=np.uint8)])),
+            ('EMPTY.TXT', b''),
+        ]
+        with tempfile.TemporaryDirectory() as dir_path:
+            source_path = Path(dir_path).joinpath('E1L1.MAP')
+            source_path.write_bytes(members[1][1])
+            output = io.BytesIO()
+            GrpWriter(chunk_size=7)(
+                [
+                    ('GAME.CON', memoryview(members[0][1])),
+                    ('E1L1.MAP', source_path),
+                    ('TILES000.ART', Unseekable(members[2][1])),
+                    ('EMPTY.TXT', io.BytesIO()),
+                ],
+                output,
+            )
+        self.assertEqual(make_grp(members), output.getvalue())
+
+    def test_name_too_long(self):
+        with self.assertRaises(ValueError):
+            GrpWriter()([('THIRTEENCHARS', b'')], io.BytesIO())
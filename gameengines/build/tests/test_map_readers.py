@@ -1,15 +1,20 @@
+import binascii
 import io
+import os
+import tempfile
+import threading
 import unittest
+from dataclasses import replace
 from pathlib import Path
 
-from gameengines.build.blood import MapReader as BloodMapReader, MapWriter as BloodMapWriter
+from gameengines.build.blood import MASTER_CRYPT_KEY, CrcWriter, MapReader as BloodMapReader, MapWriter as BloodMapWriter, crypt
 from gameengines.build.duke3d import MapReader as Duke3dMapReader, MapWriter as Duke3dMapWriter
 
 
 class TestMapReaders(unittest.TestCase):
 
     def test_blood_read(self):
-        file_path = Path(__file__).parent.joinpath(r'data\blood.map')
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
         with open(file_path, 'rb') as file:
             m = BloodMapReader()(file)
         self.assertEqual(1, m.header.numsectors)
@@ -20,7 +25,7 @@ class TestMapReaders(unittest.TestCase):
         self.assertEqual(1, len(m.sprites))
 
     def test_duke3d_read(self):
-        file_path = Path(__file__).parent.joinpath(r'data\duke3d.map')
+        file_path = Path(__file__).parent.joinpath('data', 'duke3d.map')
         with open(file_path, 'rb') as file:
             m = Duke3dMapReader()(file)
         self.assertEqual(1, len(m.sectors))
@@ -28,7 +33,7 @@ class TestMapReaders(unittest.TestCase):
         self.assertEqual(0, len(m.sprites))
 
     def test_blood_round_trip(self):
-        file_path = Path(__file__).parent.joinpath(r'data\blood.map')
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
         with open(file_path, 'rb') as file:
             input = io.BytesIO(file.read())
             m = BloodMapReader()(input)
@@ -37,10 +42,248 @@ class TestMapReaders(unittest.TestCase):
         self.assertEqual(input.getbuffer(), output.getbuffer())
 
     def test_duke3d_round_trip(self):
-        file_path = Path(__file__).parent.joinpath(r'data\duke3d.map')
+        file_path = Path(__file__).parent.joinpath('data', 'duke3d.map')
         with open(file_path, 'rb') as file:
             input = io.BytesIO(file.read())
             m = Duke3dMapReader()(input)
         output = io.BytesIO()
         Duke3dMapWriter()(m, output)
         self.assertEqual(input.getbuffer(), output.getbuffer())
+
+    def test_blood_columnar_round_trip(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        with open(file_path, 'rb') as file:
+            input = io.BytesIO(file.read())
+            m = BloodMapReader(columnar=True)(input)
+        self.assertTrue(m.columnar)
+        self.assertEqual(4, len(m.walls))
+        self.assertEqual([-2048, 2048, 2048, -2048], m.walls['x'].tolist())
+        self.assertEqual([0], list(m.extra_data['sprites']))
+        output = io.BytesIO()
+        BloodMapWriter()(m, output)
+        self.assertEqual(input.getbuffer(), output.getbuffer())
+
+    def test_duke3d_columnar_round_trip(self):
+        file_path = Path(__file__).parent.joinpath('data', 'duke3d.map')
+        with open(file_path, 'rb') as file:
+            input = io.BytesIO(file.read())
+            m = Duke3dMapReader(columnar=True)(input)
+        output = io.BytesIO()
+        Duke3dMapWriter()(m, output)
+        self.assertEqual(input.getbuffer(), output.getbuffer())
+
+    def test_columnar_to_records(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        records = BloodMapReader()(io.BytesIO(data))
+        columnar = BloodMapReader(columnar=True)(io.BytesIO(data))
+        self.assertEqual(records.sectors, columnar.to_records().sectors)
+        self.assertEqual(records.walls, columnar.to_records().walls)
+        self.assertEqual(records.sprites, columnar.to_records().sprites)
+        self.assertEqual(records.sprites[0].extra_data, columnar.to_records().sprites[0].extra_data)
+        output = io.BytesIO()
+        BloodMapWriter()(records.to_columnar(), output)
+        self.assertEqual(data, output.getvalue())
+
+    def test_blood_columnar_interleaved_extra_data(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        with open(file_path, 'rb') as file:
+            m = BloodMapReader()(file)
+        for index, extra in enumerate((-1, 5, 0, 7)):
+            sprite = replace(m.sprites[0], x=index, extra=extra)
+            sprite.extra_data = bytes([index]) * m.header.x_sprite_size if extra > 0 else None
+            m.sprites.append(sprite)
+        output = io.BytesIO()
+        BloodMapWriter()(m, output)
+        columnar = BloodMapReader(columnar=True)(io.BytesIO(output.getvalue()))
+        self.assertEqual([0, 0, 1, 2, 3], columnar.sprites['x'].tolist())
+        self.assertEqual([0, 2, 4], sorted(columnar.extra_data['sprites']))
+        self.assertEqual(b'\x03' * m.header.x_sprite_size, columnar.extra_data['sprites'][4])
+        self.assertEqual(m.sprites, BloodMapReader()(io.BytesIO(output.getvalue())).sprites)
+
+    def test_blood_bulk_matches_per_record(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        with open(file_path, 'rb') as file:
+            m = BloodMapReader()(file)
+        for index, extra in enumerate((3, -1, 9)):
+            sprite = replace(m.sprites[0], x=index, extra=extra)
+            sprite.extra_data = bytes([index]) * m.header.x_sprite_size if extra > 0 else None
+            m.sprites.append(sprite)
+        output = io.BytesIO()
+        BloodMapWriter()(m, output)
+        bulk = BloodMapReader(bulk=True)(io.BytesIO(output.getvalue()))
+        per_record = BloodMapReader(bulk=False)(io.BytesIO(output.getvalue()))
+        self.assertEqual(per_record.walls, bulk.walls)
+        self.assertEqual(per_record.sprites, bulk.sprites)
+        self.assertEqual(
+            [sprite.extra_data for sprite in per_record.sprites],
+            [sprite.extra_data for sprite in bulk.sprites],
+        )
+
+    def test_blood_crypt(self):
+        data = bytes(range(256)) * 3 + b'\x01\x02\x03'
+        record_size, key = 40, MASTER_CRYPT_KEY + 17
+        expected = bytearray()
+        for offset in range(0, len(data), record_size):
+            for index, byte in enumerate(data[offset:offset + record_size]):
+                expected.append(byte ^ ((key + index) & 0xFF))
+        self.assertEqual(bytes(expected), crypt(data, record_size, key))
+        self.assertEqual(data, crypt(crypt(data, record_size, key), record_size, key))
+
+    def test_blood_bulk_writer_matches_per_record(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        with open(file_path, 'rb') as file:
+            m = BloodMapReader()(file)
+        for index, extra in enumerate((-1, 4)):
+            sprite = replace(m.sprites[0], x=index, extra=extra)
+            sprite.extra_data = bytes([index]) * m.header.x_sprite_size if extra > 0 else None
+            m.sprites.append(sprite)
+        bulk, per_record = io.BytesIO(), io.BytesIO()
+        BloodMapWriter(bulk=True)(m, bulk)
+        BloodMapWriter(bulk=False)(m, per_record)
+        self.assertEqual(per_record.getvalue(), bulk.getvalue())
+
+    def write_lazy_blood_map(self, dir_path: str) -> tuple[Path, bytes, object]:
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        with open(file_path, 'rb') as file:
+            m = BloodMapReader()(file)
+        for index, extra in enumerate((-1, 5, 0, 7)):
+            sprite = replace(m.sprites[0], x=index, extra=extra)
+            sprite.extra_data = bytes([index]) * m.header.x_sprite_size if extra > 0 else None
+            m.sprites.append(sprite)
+        output = io.BytesIO()
+        BloodMapWriter()(m, output)
+        map_path = Path(dir_path).joinpath('lazy.map')
+        map_path.write_bytes(output.getvalue())
+        return map_path, output.getvalue(), m
+
+    def test_blood_lazy_read(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            map_path, data, m = self.write_lazy_blood_map(dir_path)
+            with BloodMapReader(lazy=True).open(map_path) as lazy:
+                self.assertEqual(5, len(lazy.sprites))
+                self.assertEqual(m.sprites[-1], lazy.sprites[-1])
+                self.assertEqual(m.sprites[-1].extra_data, lazy.sprites[-1].extra_data)
+                self.assertEqual(m.walls, list(lazy.walls))
+                self.assertEqual(m.sprites, lazy.sprites[:])
+                lazy_output = io.BytesIO()
+                BloodMapWriter()(lazy, lazy_output)
+                self.assertEqual(data, lazy_output.getvalue())
+
+            # Records already decoded outlive the mapping.
+            self.assertIsNone(lazy.source)
+            self.assertEqual(m.sprites[-1], lazy.sprites[-1])
+
+    def test_blood_lazy_open_skips_records(self):
+
+        class CountingMapReader(BloodMapReader):
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.walked = []
+                self.decoded = 0
+
+            def get_section_offsets(self, view, num_records, *args):
+                self.walked.append(num_records)
+                return super().get_section_offsets(view, num_records, *args)
+
+            def decrypt(self, data, key):
+                self.decoded += 1
+                return super().decrypt(data, key)
+
+        with tempfile.TemporaryDirectory() as dir_path:
+            map_path, _, m = self.write_lazy_blood_map(dir_path)
+            reader = CountingMapReader(lazy=True)
+            with reader.open(map_path) as lazy:
+                self.assertEqual(m.header, lazy.header)
+                self.assertEqual((1, 4, 5), (len(lazy.sectors), len(lazy.walls), len(lazy.sprites)))
+                self.assertEqual(([], 0), (reader.walked, reader.decoded))
+
+                # Reaching the sprites walks the sections in front of them.
+                self.assertEqual(m.sprites[2], lazy.sprites[2])
+                self.assertEqual([1, 4, 5], reader.walked)
+                self.assertEqual(1, reader.decoded)
+
+            # Once closed, records that weren't decoded can't be.
+            self.assertEqual(m.sprites[2], lazy.sprites[2])
+            with self.assertRaises(ValueError):
+                lazy.sprites[3]
+
+    def test_duke3d_lazy_read(self):
+        file_path = Path(__file__).parent.joinpath('data', 'duke3d.map')
+        with Duke3dMapReader(lazy=True).open(file_path) as m, open(file_path, 'rb') as file:
+            self.assertEqual(Duke3dMapReader()(file).walls, list(m.walls))
+
+    def test_read_from_view(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        data = file_path.read_bytes()
+        m = BloodMapReader()(memoryview(data))
+        self.assertEqual(BloodMapReader()(io.BytesIO(data)).sprites, m.sprites)
+
+    def test_blood_write_to_pipe(self):
+        data = Path(__file__).parent.joinpath('data', 'blood.map').read_bytes()
+        m = BloodMapReader()(data)
+        read_fd, write_fd = os.pipe()
+        received = []
+        with open(read_fd, 'rb') as pipe_in:
+            thread = threading.Thread(target=lambda: received.append(pipe_in.read()))
+            thread.start()
+            with open(write_fd, 'wb') as pipe_out:
+                BloodMapWriter()(m, pipe_out)
+            thread.join()
+        self.assertEqual(data, received[0])
+        self.assertEqual(binascii.crc32(data[:-4]).to_bytes(4, 'little'), data[-4:])
+
+    def test_crc_writer_short_writes(self):
+
+        class Trickle(io.RawIOBase):
+
+            # Accepts at most a few bytes per call, as a raw socket might.
+            def __init__(self):
+                super().__init__()
+                self.data = bytearray()
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                self.data.extend(data[:7])
+                return min(len(data), 7)
+
+        sink = Trickle()
+        writer = CrcWriter(sink)
+        self.assertEqual(100, writer.write(bytes(range(100))))
+        self.assertEqual(3, writer.write(b'abc'))
+        self.assertEqual(bytes(range(100)) + b'abc', sink.data)
+        self.assertEqual(binascii.crc32(sink.data), writer.crc)
+        self.assertEqual(103, writer.tell())
+
+    def test_crc_writer_would_block(self):
+
+        class Full(io.RawIOBase):
+
+            # Takes a few bytes, then reports no progress as a full
+            # non-blocking pipe does.
+            def __init__(self, stalled):
+                super().__init__()
+                self.data = bytearray()
+                self.stalled = stalled
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                if self.data:
+                    return self.stalled
+                self.data.extend(data[:5])
+                return 5
+
+        for stalled in (None, 0):
+            sink = Full(stalled)
+            writer = CrcWriter(sink)
+            with self.assertRaises(BlockingIOError) as context:
+                writer.write(bytes(range(20)))
+            self.assertEqual(5, context.exception.characters_written)
+            self.assertEqual(binascii.crc32(sink.data), writer.crc)
+            self.assertEqual(5, writer.tell())
@@ -0,0 +1,47 @@
+import struct
+import unittest
+
+import numpy as np
+
+from gameengines.build.palette import Palette
+
+
+def make_palette_dat(numshades: int = 4) -> bytes:
+    colors = np.repeat(np.arange(256, dtype=np.uint8) // 4, 3)
+    shades = np.array([np.maximum(np.arange(256) - shade, 0) for shade in range(numshades)], dtype=np.uint8)
+    translucency = np.add.outer(np.arange(256), np.arange(256)) // 2
+    return colors.tobytes() + struct.pack('<h', numshades) + shades.tobytes() + translucency.astype(np.uint8).tobytes()
+
+
+class TestPalette(unittest.TestCase):
+
+    def test_load_palette_only(self):
+        palette = Palette()
+        palette.load(make_palette_dat()[:768])
+        self.assertEqual(1, palette.numshades)
+        self.assertIsNone(palette.translucency)
+        self.assertEqual([252, 252, 252], palette.data[255].tolist())
+
+    def test_load(self):
+        palette = Palette()
+        palette.load(memoryview(make_palette_dat()))
+        self.assertEqual(4, palette.numshades)
+        self.assertEqual((4, 256, 3), palette.table.shape)
+        self.assertEqual((256, 256), palette.translucency.shape)
+
+    def test_apply(self):
+        palette = Palette()
+        palette.load(make_palette_dat())
+        indices = np.array([[8, 9], [10, 11]], dtype=np.uint8)
+        np.testing.assert_array_equal(palette.data[indices], palette.apply(indices))
+        np.testing.assert_array_equal(palette.data[indices - 2], palette.apply(indices, shade=2))
+        np.testing.assert_array_equal(palette.data[indices - 3], palette.apply(indices, shade=10))
+        shades = np.array([[0, 1], [2, 3]])
+        np.testing.assert_array_equal(palette.data[indices - shades], palette.apply(indices, shade=shades))
+        pal = np.roll(np.arange(256, dtype=np.uint8), 1)
+        np.testing.assert_array_equal(palette.data[indices - 1], palette.apply(indices, pal=pal))
+
+    def test_blend(self):
+        palette = Palette()
+        palette.load(make_palette_dat())
+        self.assertEqual([15], palette.blend(np.array([10]), np.array([20])).tolist())
@@ -0,0 +1,38 @@
+import unittest
+
+from gameengines.build.portals import link_portals
+from gameengines.build.tests.test_graph import link_row
+from gameengines.build.tests.test_spatial import make_grid_map
+from gameengines.build.validate import validate
+
+
+class TestLinkPortals(unittest.TestCase):
+
+    def test_row(self):
+        m = make_grid_map(3, 1)
+        expected = make_grid_map(3, 1)
+        link_row(expected, 3)
+        self.assertEqual(4, link_portals(m))
+        self.assertEqual(expected.walls, m.walls)
+
+    def test_grid(self):
+        m = make_grid_map(4, 3).to_columnar()
+        self.assertEqual(2 * (3 * 3 + 4 * 2), link_portals(m))
+        self.assertTrue(validate(m).is_valid)
+
+    def test_replaces_existing_links(self):
+        m = make_grid_map(2, 1)
+        m.walls[0].nextwall, m.walls[0].nextsector = 6, 1
+        link_portals(m)
+        self.assertEqual((-1, -1), (m.walls[0].nextwall, m.walls[0].nextsector))
+        self.assertEqual((7, 1), (m.walls[1].nextwall, m.walls[1].nextsector))
+
+    def test_large_map(self):
+        m = make_grid_map(64, 64).to_columnar()
+
+        # Build maps cap out well below this, but the linker shouldn't care.
+        walls = m.walls
+        linked = link_portals(m)
+        self.assertEqual(2 * 2 * 64 * 63, linked)
+        self.assertTrue(validate(m).is_valid)
+        self.assertIs(walls, m.walls)
@@ -0,0 +1,98 @@
+import io
+import unittest
+from pathlib import Path
+
+from gameengines.build.blood import MapReader as BloodMapReader, MapWriter as BloodMapWriter
+from gameengines.build.duke3d import MapReader as Duke3dMapReader, MapWriter as Duke3dMapWriter
+from gameengines.build.profiling import log_phase
+
+
+DATA_DIR = Path(__file__).parent.joinpath('data')
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_duke3d(self):
+        data = DATA_DIR.joinpath('duke3d.map').read_bytes()
+        stats = []
+        m = Duke3dMapReader(observer=stats.append)(io.BytesIO(data))
+        output = io.BytesIO()
+        Duke3dMapWriter(observer=stats.append)(m, output)
+
+        phases = ['header', 'sectors', 'walls', 'sprites']
+        self.assertEqual([('read', phase) for phase in phases] + [('write', phase) for phase in phases], [
+            (s.operation, s.phase) for s in stats
+        ])
+        self.assertEqual([1, 1, 4, 0] * 2, [s.records for s in stats])
+        self.assertEqual(len(data), sum(s.bytes for s in stats[:4]))
+        self.assertEqual(len(data), sum(s.bytes for s in stats[4:]))
+        self.assertTrue(all(s.seconds >= 0 for s in stats))
+
+    def test_blood(self):
+        data = DATA_DIR.joinpath('blood.map').read_bytes()
+        stats = []
+        m = BloodMapReader(observer=stats.append)(data)
+        BloodMapWriter(observer=stats.append)(m, io.BytesIO())
+
+        read = [s for s in stats if s.operation == 'read' and s.phase != 'decrypt']
+        self.assertEqual(['header', 'sectors', 'walls', 'sprites'], [s.phase for s in read])
+
+        # The trailing CRC isn't checked on reading.
+        self.assertEqual(len(data) - 4, sum(s.bytes for s in read))
+
+        # Each section is decrypted as part of reading it.
+        decrypts = [s for s in stats if s.phase == 'decrypt']
+        self.assertEqual([37, 130, 40, 128, 44], [s.bytes for s in decrypts])
+        self.assertEqual(5, len([s for s in stats if s.phase == 'encrypt']))
+        self.assertEqual(('write', 'crc', 4), (stats[-1].operation, stats[-1].phase, stats[-1].bytes))
+
+    def test_lazy(self):
+
+        class CountingMapReader(BloodMapReader):
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.walked = []
+
+            def get_section_offsets(self, view, num_records, *args):
+                self.walked.append(num_records)
+                return super().get_section_offsets(view, num_records, *args)
+
+        stats = []
+        reader = CountingMapReader(lazy=True, observer=stats.append)
+        with reader.open(DATA_DIR.joinpath('blood.map')) as m:
+            self.assertEqual([], reader.walked)
+            read = [s for s in stats if s.phase != 'decrypt']
+            self.assertEqual(['header', 'sectors', 'walls', 'sprites'], [s.phase for s in read])
+
+            # Sections whose size isn't known yet don't report bytes.
+            self.assertEqual([None] * 3, [s.bytes for s in read[1:]])
+            self.assertEqual([len(m.sectors), len(m.walls), len(m.sprites)], [s.records for s in read[1:]])
+
+    def test_unmeasurable_stream(self):
+
+        class Unseekable(io.RawIOBase):
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                return len(data)
+
+        stats = []
+        m = Duke3dMapReader()(DATA_DIR.joinpath('duke3d.map').read_bytes())
+        Duke3dMapWriter(observer=stats.append)(m, Unseekable())
+        self.assertEqual([None] * 4, [s.bytes for s in stats])
+        self.assertEqual([1, 1, 4, 0], [s.records for s in stats])
+
+    def test_log_phase(self):
+        with self.assertLogs('gameengines.build.profiling', level='DEBUG') as logs:
+            Duke3dMapReader(observer=log_phase)(DATA_DIR.joinpath('duke3d.map').read_bytes())
+        self.assertEqual(4, len(logs.output))
+        self.assertIn('read walls', logs.output[2])
+        self.assertIn('4 records', logs.output[2])
+
+    def test_disabled(self):
+        reader = Duke3dMapReader()
+        self.assertIsNone(reader.observer)
+        self.assertEqual(4, len(reader(DATA_DIR.joinpath('duke3d.map').read_bytes()).walls))
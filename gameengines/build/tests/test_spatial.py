@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+
+from gameengines.build.map import Map, Sector, Wall
+from gameengines.build.spatial import SectorIndex
+
+
+def make_grid_map(columns: int, rows: int, size: int = 1024) -> Map:
+    m = Map()
+    for row in range(rows):
+        for column in range(columns):
+            x, y = column * size, row * size
+            wallptr = len(m.walls)
+            m.sectors.append(Sector(wallptr=wallptr, wallnum=4))
+            for index, (wx, wy) in enumerate(((x, y), (x + size, y), (x + size, y + size), (x, y + size))):
+                m.walls.append(Wall(x=wx, y=wy, point2=wallptr + (index + 1) % 4))
+    return m
+
+
+class TestSectorIndex(unittest.TestCase):
+
+    def test_find(self):
+        m = make_grid_map(3, 2)
+        index = SectorIndex(m)
+        self.assertEqual(0, index.find(10, 10))
+        self.assertEqual(2, index.find(2100, 500))
+        self.assertEqual(5, index.find(3000, 2000))
+        self.assertEqual(-1, index.find(-10, 10))
+        self.assertEqual(-1, index.find(5000, 10))
+
+    def test_find_many(self):
+        m = make_grid_map(8, 5, size=512)
+        index = SectorIndex(m, cell_size=700)
+        rng = np.random.default_rng(0)
+        x = rng.integers(-100, 8 * 512 + 100, 5000)
+        y = rng.integers(-100, 5 * 512 + 100, 5000)
+
+        # Which side of a shared edge a point on it falls is down to the
+        # engine's crossing rule, so keep clear of them.
+        off_edges = (x % 512 != 0) & (y % 512 != 0)
+        x, y = x[off_edges], y[off_edges]
+        expected = np.where(
+            (x >= 0) & (x < 8 * 512) & (y >= 0) & (y < 5 * 512),
+            (y // 512) * 8 + x // 512,
+            -1,
+        )
+        np.testing.assert_array_equal(expected, index.find_many(x, y))
+
+    def test_concave_sector_with_hole(self):
+        m = Map()
+        outer = ((0, 0), (3000, 0), (3000, 3000), (0, 3000))
+        hole = ((1000, 1000), (1000, 2000), (2000, 2000), (2000, 1000))
+        m.sectors.append(Sector(wallptr=0, wallnum=8))
+        for start, loop in ((0, outer), (4, hole)):
+            for i, (x, y) in enumerate(loop):
+                m.walls.append(Wall(x=x, y=y, point2=start + (i + 1) % 4))
+        index = SectorIndex(m)
+        self.assertEqual(0, index.find(500, 500))
+        self.assertEqual(-1, index.find(1500, 1500))
+
+    def test_update(self):
+        m = make_grid_map(2, 1)
+        index = SectorIndex(m)
+        for wall in (5, 6):
+            m.walls[wall].x += 4096
+        index.update(m, [5, 6])
+        self.assertEqual(1, index.find(4000, 500))
+        self.assertEqual(0, index.find(500, 500))
+        index.update(m.to_columnar())
+        self.assertEqual(1, index.find(5000, 500))
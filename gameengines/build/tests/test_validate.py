@@ -0,0 +1,61 @@
+import io
+import unittest
+from pathlib import Path
+
+from gameengines.build.blood import MapReader as BloodMapReader
+from gameengines.build.map import Sprite
+from gameengines.build.tests.test_graph import link_row
+from gameengines.build.tests.test_spatial import make_grid_map
+from gameengines.build.validate import validate
+
+
+class TestValidate(unittest.TestCase):
+
+    def setUp(self):
+        self.m = make_grid_map(3, 1)
+        link_row(self.m, 3)
+
+    def test_valid(self):
+        report = validate(self.m)
+        self.assertTrue(report.is_valid, report.summary())
+        self.assertTrue(validate(self.m.to_columnar()).is_valid)
+
+    def test_valid_test_data(self):
+        file_path = Path(__file__).parent.joinpath('data', 'blood.map')
+        with open(file_path, 'rb') as file:
+            self.assertTrue(validate(BloodMapReader()(io.BytesIO(file.read()))).is_valid)
+
+    def test_bad_point2(self):
+        self.m.walls[2].point2 = 5
+        report = validate(self.m)
+        self.assertEqual([2], report.bad_point2.tolist())
+        self.assertEqual([3], report.open_loops.tolist())
+
+    def test_open_loop(self):
+        self.m.walls[1].point2 = 3
+        report = validate(self.m)
+        self.assertEqual([2, 3], report.open_loops.tolist())
+
+    def test_bad_wall_ranges(self):
+        self.m.sectors[2].wallnum = 5
+        report = validate(self.m)
+        self.assertEqual([2], report.bad_wall_ranges.tolist())
+        self.assertEqual([8, 9, 10, 11], report.unowned_walls.tolist())
+
+    def test_shared_walls(self):
+        self.m.sectors[1].wallptr = 3
+        self.assertEqual([3], validate(self.m).shared_walls.tolist())
+
+    def test_asymmetric_portals(self):
+        self.m.walls[5].nextwall = 0
+        report = validate(self.m)
+        self.assertEqual([5, 11], report.asymmetric_portals.tolist())
+
+    def test_bad_portals(self):
+        self.m.walls[0].nextwall = 2
+        self.m.walls[2].nextsector = 9
+        self.assertEqual([0, 2], validate(self.m).bad_portals.tolist())
+
+    def test_bad_sprite_sectors(self):
+        self.m.sprites = [Sprite(sectnum=0), Sprite(sectnum=3), Sprite(sectnum=-1)]
+        self.assertEqual([1, 2], validate(self.m).bad_sprite_sectors.tolist())
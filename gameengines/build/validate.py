@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+from gameengines.build.map import Map
+from gameengines.build.spatial import get_ranks
+
+
+def empty() -> np.ndarray:
+    return np.empty(0, dtype=np.int64)
+
+
+@dataclass
+class ValidationReport:
+
+    """
+    Indices of the records breaking each structural invariant. Every field
+    is empty for a well formed map.
+
+    """
+
+    # Sectors whose [wallptr, wallptr + wallnum) range is empty or runs off
+    # the end of the wall list.
+    bad_wall_ranges: np.ndarray = field(default_factory=empty)
+
+    # Walls claimed by no sector, or by more than one.
+    unowned_walls: np.ndarray = field(default_factory=empty)
+    shared_walls: np.ndarray = field(default_factory=empty)
+
+    # Walls whose point2 leaves their sector's range or points at themselves.
+    bad_point2: np.ndarray = field(default_factory=empty)
+
+    # Walls that aren't the point2 of exactly one wall, so their sector's
+    # loops don't close.
+    open_loops: np.ndarray = field(default_factory=empty)
+
+    # Walls whose nextwall or nextsector is out of range, or where only one
+    # of the two is set.
+    bad_portals: np.ndarray = field(default_factory=empty)
+
+    # Walls whose nextwall doesn't lead straight back to them, or whose
+    # nextsector doesn't own their nextwall.
+    asymmetric_portals: np.ndarray = field(default_factory=empty)
+
+    # Sprites whose sectnum isn't a sector.
+    bad_sprite_sectors: np.ndarray = field(default_factory=empty)
+
+    @property
+    def is_valid(self) -> bool:
+        return not any(len(getattr(self, f.name)) for f in fields(self))
+
+    def summary(self) -> dict[str, int]:
+        return {f.name: len(getattr(self, f.name)) for f in fields(self)}
+
+
+def validate(m: Map) -> ValidationReport:
+    """
+    Check the structural invariants of a map over whole columns at once.
+
+    """
+    m = m.to_columnar()
+    num_sectors, num_walls = len(m.sectors), len(m.walls)
+    wallptr = m.sectors['wallptr'].astype(np.int64)
+    wallnum = m.sectors['wallnum'].astype(np.int64)
+    point2 = m.walls['point2'].astype(np.int64)
+    nextwall = m.walls['nextwall'].astype(np.int64)
+    nextsector = m.walls['nextsector'].astype(np.int64)
+    sectnum = m.sprites['sectnum'].astype(np.int64)
+    report = ValidationReport()
+
+    bad_ranges = (wallptr < 0) | (wallnum <= 0) | (wallptr + wallnum > num_walls)
+    report.bad_wall_ranges = np.flatnonzero(bad_ranges)
+
+    # Map every wall to its owning sector, counting how many claim it.
+    sectors = np.flatnonzero(~bad_ranges)
+    counts = wallnum[sectors]
+    owned = np.repeat(wallptr[sectors], counts) + get_ranks(counts)
+    owners = np.bincount(owned, minlength=num_walls)
+    report.unowned_walls = np.flatnonzero(owners == 0)
+    report.shared_walls = np.flatnonzero(owners > 1)
+    wall_sectors = np.full(num_walls, -1, dtype=np.int64)
+    wall_sectors[owned] = np.repeat(sectors, counts)
+
+    # point2 must stay inside the owning sector's range.
+    walls = np.arange(num_walls)
+    has_sector = wall_sectors >= 0
+    start = np.where(has_sector, wallptr[wall_sectors], 0)
+    end = np.where(has_sector, start + wallnum[wall_sectors], 0)
+    bad_point2 = has_sector & ((point2 < start) | (point2 >= end) | (point2 == walls))
+    report.bad_point2 = np.flatnonzero(bad_point2)
+
+    # With point2 in range, the loops close exactly when point2 is a
+    # permutation, ie every wall is the point2 of exactly one wall.
+    targets = point2[has_sector & ~bad_point2]
+    incoming = np.bincount(targets, minlength=num_walls)
+    report.open_loops = np.flatnonzero(has_sector & ~bad_point2 & (incoming != 1))
+
+    # Portal links must be in range and set together.
+    nextwall_set, nextsector_set = nextwall != -1, nextsector != -1
+    bad_portals = (
+        (nextwall < -1) | (nextwall >= num_walls)
+        | (nextsector < -1) | (nextsector >= num_sectors)
+        | (nextwall_set != nextsector_set)
+    )
+    report.bad_portals = np.flatnonzero(bad_portals)
+
+    # The other side of a portal must point straight back.
+    portals = np.flatnonzero(nextwall_set & ~bad_portals)
+    other = nextwall[portals]
+    asymmetric = (
+        (nextwall[other] != portals)
+        | (nextsector[portals] != wall_sectors[other])
+        | (nextsector[other] != wall_sectors[portals])
+    )
+    report.asymmetric_portals = portals[asymmetric]
+
+    report.bad_sprite_sectors = np.flatnonzero((sectnum < 0) | (sectnum >= num_sectors))
+    return report
@@ -0,0 +1,199 @@
+"""
+Convert every Build map in a directory or GRP archive to another format.
+
+    python -m gameengines.convert MAPS_DIR_OR_GRP {duke3d,blood,havoc} -o OUTPUT_DIR
+
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from gameengines.build.blood import Map as BloodMap, MapReader as BloodMapReader, MapWriter as BloodMapWriter
+from gameengines.build.duke3d import Map as Duke3dMap, MapReader as Duke3dMapReader, MapWriter as Duke3dMapWriter
+from gameengines.build.grp import GRP_MAGIC, Grp
+from gameengines.build.map import Map
+from gameengines.build.spatial import SectorIndex
+from gameengines.wolf3d.map import HavocMapWriter, Wolf3dMap
+
+
+BLOOD_SIGNATURE = b'BLM\x1a'
+
+TARGETS = ('duke3d', 'blood', 'havoc')
+
+# Wolf3D tile codes: plane 0 holds walls and floor areas, plane 1 objects.
+WALL_TILE = 1
+AREA_TILE = 108
+PLAYER_START_TILES = (20, 21, 22, 19)   # Facing east, south, west, north.
+
+MEGABYTE = 1000 * 1000
+
+
+@dataclass
+class Source:
+
+    name: str
+    file_path: str
+    offset: int = 0
+    size: int = -1
+
+
+@dataclass
+class Result:
+
+    name: str
+    input_size: int = 0
+    output_size: int = 0
+    seconds: float = 0
+    error: str | None = None
+
+
+def read_source(source: Source) -> bytes:
+    with open(source.file_path, 'rb') as file:
+        file.seek(source.offset)
+        return file.read(source.size)
+
+
+def read_map(data: bytes) -> Map:
+    """
+    Read a Duke3D or Blood map, told apart by Blood's signature.
+
+    """
+    reader_cls = BloodMapReader if data[:len(BLOOD_SIGNATURE)] == BLOOD_SIGNATURE else Duke3dMapReader
+    return reader_cls(columnar=True)(data)
+
+
+def rasterize(m: Map, width: int = 64, height: int = 64, name: str = 'New Map') -> Wolf3dMap:
+    """
+    Sample the map's sectors on a width by height tile grid fitted to its
+    bounds. Tiles whose centre falls in a sector become floor and the rest
+    wall, with the player start carried over where it lands on the grid.
+
+    """
+    m = m.to_columnar()
+    wolf3d_map = Wolf3dMap(name, width, height)
+    wolf3d_map.tiles[:, :, 0] = WALL_TILE
+    if not len(m.walls):
+        return wolf3d_map
+    x, y = m.walls['x'].astype(np.int64), m.walls['y'].astype(np.int64)
+    left, top = x.min(), y.min()
+    tile_size = max(1, -(-max(x.max() - left, y.max() - top) // min(width, height)))
+
+    columns, rows = np.meshgrid(np.arange(width), np.arange(height), indexing='ij')
+    xs = left + columns.ravel() * tile_size + tile_size // 2
+    ys = top + rows.ravel() * tile_size + tile_size // 2
+    inside = SectorIndex(m).find_many(xs, ys).reshape(width, height) >= 0
+    wolf3d_map.tiles[inside, 0] = AREA_TILE
+
+    column, row = (m.header.posx - left) // tile_size, (m.header.posy - top) // tile_size
+    if 0 <= column < width and 0 <= row < height:
+        facing = round((m.header.ang % 2048) / 512) % 4
+        wolf3d_map.tiles[column, row, 1] = PLAYER_START_TILES[facing]
+    return wolf3d_map
+
+
+def convert(data: bytes, target: str, output_path: str) -> int:
+    """
+    Convert a single map to the target format, writing it to output_path.
+    Returns the number of bytes written.
+
+    """
+    m = read_map(data)
+    if target == 'havoc':
+        HavocMapWriter()(rasterize(m, name=Path(output_path).stem[:32]), output_path)
+        return os.path.getsize(output_path)
+    map_cls, writer_cls = (BloodMap, BloodMapWriter) if target == 'blood' else (Duke3dMap, Duke3dMapWriter)
+    with open(output_path, 'wb') as file:
+        writer_cls()(map_cls.from_map(m), file)
+        return file.tell()
+
+
+def convert_source(source: Source, target: str, output_dir: str) -> Result:
+    result = Result(source.name)
+    start = time.perf_counter()
+    try:
+        data = read_source(source)
+        result.input_size = len(data)
+        output_path = os.path.join(output_dir, source.name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        result.output_size = convert(data, target, output_path)
+    except Exception as e:
+        result.error = f'{type(e).__name__}: {e}'
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def is_grp(file_path: str) -> bool:
+    with open(file_path, 'rb') as file:
+        return file.read(len(GRP_MAGIC)) == GRP_MAGIC
+
+
+def find_sources(input_path: str) -> list[Source]:
+    """
+    List the maps in a GRP archive, or in a directory and its subdirectories.
+
+    """
+    if os.path.isdir(input_path):
+        return [
+            Source(str(file_path.relative_to(input_path)), str(file_path))
+            for file_path in sorted(Path(input_path).rglob('*'))
+            if file_path.suffix.lower() == '.map' and file_path.is_file()
+        ]
+    if is_grp(input_path):
+        grp = Grp()
+        grp.index(input_path)
+        return [
+            Source(os.path.basename(entry.name), input_path, entry.offset, entry.size)
+            for entry in grp.entries.values()
+            if entry.name.lower().endswith('.map')
+        ]
+    return [Source(os.path.basename(input_path), input_path)]
+
+
+def get_throughput(results: list[Result], seconds: float) -> tuple[float, float]:
+    seconds = max(seconds, 1e-9)
+    return len(results) / seconds, sum(result.input_size for result in results) / MEGABYTE / seconds
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m gameengines.convert', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='directory of maps, GRP archive or single map')
+    parser.add_argument('target', choices=TARGETS, help='format to convert to')
+    parser.add_argument('-o', '--output', required=True, help='directory to write converted maps to')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    sources = find_sources(args.input)
+    os.makedirs(args.output, exist_ok=True)
+    results = []
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(convert_source, source, args.target, args.output) for source in sources]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result.error is None:
+                rate = result.input_size / MEGABYTE / max(result.seconds, 1e-9)
+                print(f'{result.name}: {result.input_size} -> {result.output_size} bytes in {result.seconds:.3f}s ({rate:.2f} MB/s)')
+            else:
+                print(f'{result.name}: FAILED {result.error}', file=sys.stderr)
+    seconds = time.perf_counter() - start
+
+    failures = [result for result in results if result.error is not None]
+    maps_per_second, megabytes_per_second = get_throughput(results, seconds)
+    print(
+        f'Converted {len(results) - len(failures)}/{len(results)} maps in {seconds:.2f}s '
+        f'({maps_per_second:.1f} maps/s, {megabytes_per_second:.2f} MB/s), {len(failures)} failed'
+    )
+    for result in sorted(failures, key=lambda result: result.name):
+        print(f'  {result.name}: {result.error}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())